@@ -4,51 +4,65 @@ from pprint import pprint
 from dataclasses import dataclass
 
 import IPython
+import click
 import numpy as np
 
 from memory import DOLMemory
-from melee import FighterKind, FighterBone, JObj_Flags, JObj, Melee
+from snapshot import SnapshotMemory
+from melee import FighterKind, FighterBone, JObj_Flags, JObj, Melee, walk_jobj_tree
 from petrautil.hexdump import hexdump
 
 # logging.basicConfig(level=logging.DEBUG)
 np.set_printoptions(linewidth=120)
 
-mem = DOLMemory()
-melee = Melee(mem)
 
-fighter = melee.get_fighter(slot=0)
-parts = fighter.get_fighterbones()
+@click.command()
+@click.option("--snapshot", type=click.Path(exists=True), help="read from a RAM dump instead of dolphin")
+@click.option("--tree", is_flag=True, help="walk the jobj tree from the root bone instead of the bone table")
+@click.option("--profile", is_flag=True, help="report where the RAM reads went")
+def cli(snapshot, tree, profile):
+    mem = SnapshotMemory(snapshot) if snapshot else DOLMemory()
+    if profile:
+        mem.enable_profiling()
 
-# def dump_jobj(p_jobj, depth=0):
-#     idt = '  ' * depth
-#     print(idt + f'{p_jobj:x}')
-#     print(idt + f' \\- flags:{flags}')
-#     print(idt + f' |- {rotate=}')
-#     print(idt + f' |- {scale=}')
-#     print(idt + f' |- {translate=}')
+    try:
+        dump_bones(mem, tree)
+    finally:
+        if profile:
+            print(mem.profiler.report())
 
 
-# def walk_jobj(p_jobj, depth=0):
-#     dump_jobj(p_jobj, depth=depth)
+def dump_bones(mem, tree):
+    melee = Melee(mem)
 
-#     p_child = mem.readv(p_jobj + 0x10, "I")
-#     if p_child != 0:
-#         dump_jobj(p_child, depth=depth + 1)
+    fighter = melee.get_fighter(slot=0)
+    parts = fighter.get_fighterbones()
 
-#     p_next = mem.readv(p_jobj + 0x08, "I")
-#     if p_next != 0:
-#         dump_jobj(p_next, depth=depth)
+    if tree:
+        ptrs, parent_index, _ = walk_jobj_tree(mem, parts[0].p_joint)
 
+        depth = [0] * len(ptrs)
+        for i, parent in enumerate(parent_index):
+            if parent >= 0:
+                depth[i] = depth[parent] + 1
 
-# dump_jobj(parts[0].p_joint)
-for i, bone in enumerate(parts):
-    print(f" --- {i:02} --- ")
-    jobj = JObj.from_mem(mem, bone.p_joint)
-    # print(f"""{bone.p_joint:08x}
-    # {jobj.translate=}
-    # {jobj.rotate=}
-    # {jobj.flags=}""")
-    pprint(jobj)
+        # bfs order; print as an indented list of who hangs off what
+        for i, p_jobj in enumerate(ptrs):
+            parent = f"{ptrs[parent_index[i]]:08x}" if parent_index[i] >= 0 else "-"
+            print(f"{'  ' * depth[i]}{p_jobj:08x} (parent {parent})")
+        return
 
+    for i, bone in enumerate(parts):
+        print(f" --- {i:02} --- ")
+        jobj = JObj.from_mem(mem, bone.p_joint)
+        # print(f"""{bone.p_joint:08x}
+        # {jobj.translate=}
+        # {jobj.rotate=}
+        # {jobj.flags=}""")
+        pprint(jobj)
 
-# IPython.embed()
+    # IPython.embed()
+
+
+if __name__ == "__main__":
+    cli()
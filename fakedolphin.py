@@ -0,0 +1,47 @@
+"""
+stand-in for dolphin when poking at the linux memory backend.
+
+maps a shared GC_RAM_SIZE region (shows up in /proc/<pid>/maps the same way
+dolphin's shm arena does), fills it with a known pattern, renames itself so
+_find_dolphin_pid() picks it up, and sleeps.
+
+every aligned word holds its own GC address, big endian, ie.
+`mem.readv(0x80001234, "I") == 0x80001234`.
+"""
+
+import mmap
+import ctypes
+import signal
+
+import click
+import numpy as np
+
+from memory import GC_RAM_START, GC_RAM_SIZE
+
+PR_SET_NAME = 15
+
+
+def make_fake_ram() -> mmap.mmap:
+    ram = mmap.mmap(-1, GC_RAM_SIZE, flags=mmap.MAP_SHARED)
+
+    words = np.frombuffer(ram, dtype=">u4")
+    words[:] = GC_RAM_START + 4 * np.arange(GC_RAM_SIZE // 4, dtype=np.uint32)
+    del words  # let go of the buffer export so ram can be closed
+
+    return ram
+
+
+@click.command()
+@click.option("--name", default="dolphin-emu", help="process name to pose as")
+def cli(name):
+    ram = make_fake_ram()
+
+    libc = ctypes.CDLL(None)
+    libc.prctl(PR_SET_NAME, name.encode(), 0, 0, 0)
+
+    print("ready", flush=True)
+    signal.pause()
+
+
+if __name__ == "__main__":
+    cli()
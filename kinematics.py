@@ -0,0 +1,262 @@
+"""
+batched forward kinematics for HSD joint trees (JObjArray).
+
+matrices are 3x4 affine, same as the game's Mtx: [R*S | T]. local
+matrices for every joint are built at once; world matrices are then
+composed one tree level at a time, each level as a single batched matmul.
+
+follows HSD_JObjSetupMatrix:
+  - rotate is euler xyz (R = Rz @ Ry @ Rx), or an xyzw quaternion with
+    USE_QUATERNION
+  - without CLASSICAL_SCALE, the parent's accumulated scale is divided back
+    out (scale compensation, like maya's segmentScaleCompensate)
+  - MTX_INDEP_PARENT joints don't inherit their parent's matrix
+  - USER_DEF_MTX / MTX_INDEP_SRT joints aren't driven by SRT at all; we
+    take the game's own matrix for those
+"""
+
+import numpy as np
+
+from melee import JObj_Flags, JObjArray
+
+F_CLASSICAL_SCALE = JObj_Flags.CLASSICAL_SCALE.value
+F_USE_QUATERNION = JObj_Flags.USE_QUATERNION.value
+F_MTX_INDEP_PARENT = JObj_Flags.MTX_INDEP_PARENT.value
+F_USER_MTX = JObj_Flags.USER_DEF_MTX.value | JObj_Flags.MTX_INDEP_SRT.value
+F_MTX_DIRTY = JObj_Flags.MTX_DIRTY.value
+
+
+def euler_to_mtx(rotate: np.ndarray) -> np.ndarray:
+    """(N, 3) xyz euler angles -> (N, 3, 3) rotation matrices, R = Rz @ Ry @ Rx"""
+    sx, sy, sz = np.sin(rotate).T
+    cx, cy, cz = np.cos(rotate).T
+
+    R = np.empty((len(rotate), 3, 3), dtype=rotate.dtype)
+    R[:, 0, 0] = cy * cz
+    R[:, 0, 1] = sx * sy * cz - cx * sz
+    R[:, 0, 2] = cx * sy * cz + sx * sz
+    R[:, 1, 0] = cy * sz
+    R[:, 1, 1] = sx * sy * sz + cx * cz
+    R[:, 1, 2] = cx * sy * sz - sx * cz
+    R[:, 2, 0] = -sy
+    R[:, 2, 1] = sx * cy
+    R[:, 2, 2] = cx * cy
+
+    return R
+
+
+def quat_to_mtx(quat: np.ndarray) -> np.ndarray:
+    """(N, 4) xyzw quaternions -> (N, 3, 3) rotation matrices"""
+    x, y, z, w = quat.T
+
+    R = np.empty((len(quat), 3, 3), dtype=quat.dtype)
+    R[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    R[:, 0, 1] = 2 * (x * y - w * z)
+    R[:, 0, 2] = 2 * (x * z + w * y)
+    R[:, 1, 0] = 2 * (x * y + w * z)
+    R[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    R[:, 1, 2] = 2 * (y * z - w * x)
+    R[:, 2, 0] = 2 * (x * z - w * y)
+    R[:, 2, 1] = 2 * (y * z + w * x)
+    R[:, 2, 2] = 1 - 2 * (x * x + y * y)
+
+    return R
+
+
+def compose(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a @ b for stacks of 3x4 affine matrices"""
+    out = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=np.result_type(a, b))
+    out[..., :3] = a[..., :3] @ b[..., :3]
+    out[..., 3] = (a[..., :3] @ b[..., 3:])[..., 0] + a[..., 3]
+
+    return out
+
+
+def topo_levels(parent_index: np.ndarray) -> list[np.ndarray]:
+    """
+    joint indices grouped by depth, roots (parent -1) first. every joint
+    comes after its parent. raises ValueError if the parents don't form
+    a forest.
+    """
+    n = len(parent_index)
+    depth = np.full(n, -1, dtype=np.int32)
+    depth[parent_index < 0] = 0
+
+    has_parent = parent_index >= 0
+    parents = np.where(has_parent, parent_index, 0)
+
+    levels = [np.flatnonzero(depth == 0)]
+    while len(levels[-1]):
+        d = len(levels)
+        mask = has_parent & (depth < 0) & (depth[parents] == d - 1)
+        depth[mask] = d
+        levels.append(np.flatnonzero(mask))
+    levels.pop()
+
+    if (depth < 0).any():
+        raise ValueError(f"joints {np.flatnonzero(depth < 0)} aren't reachable from a root (cycle?)")
+
+    return levels
+
+
+def accumulated_scale(skel: JObjArray, levels: list[np.ndarray]) -> np.ndarray:
+    """product of scale down the tree, per joint (HSD_JObj.scl)"""
+    parent = skel.parent_index
+    acc = np.array(skel.scale, dtype=np.float32)
+    for lvl in levels[1:]:
+        acc[lvl] *= acc[parent[lvl]]
+
+    return acc
+
+
+def local_matrices(skel: JObjArray, acc_scale: np.ndarray, idx: np.ndarray = None) -> np.ndarray:
+    """(N, 3, 4) local SRT matrices for every joint, or just for joints `idx`"""
+    idx = idx if idx is not None else slice(None)
+    flags = skel.flags[idx]
+    parent = skel.parent_index[idx]
+    rotate = skel.rotate[idx]
+
+    quat = (flags & F_USE_QUATERNION) != 0
+    R = euler_to_mtx(rotate[:, :3])
+    if quat.any():
+        R[quat] = quat_to_mtx(rotate[quat])
+
+    local = np.empty((len(flags), 3, 4), dtype=np.float32)
+    local[:, :, :3] = R * skel.scale[idx][:, None, :]
+    local[:, :, 3] = skel.translate[idx]
+
+    compensate = ((flags & F_CLASSICAL_SCALE) == 0) & (parent >= 0)
+    if compensate.any():
+        local[compensate, :, :3] /= acc_scale[parent[compensate], :, None]
+
+    return local
+
+
+def forward_kinematics(
+    skel: JObjArray,
+    root_mtx: np.ndarray = None,
+    levels: list[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    (N, 3, 4) world matrices for every joint in `skel`, comparable with the
+    game's skel.mtx. `root_mtx` is the parent of the root(s), if any.
+    pass `levels` to reuse a topo_levels() from an earlier frame.
+    """
+    parent = skel.parent_index
+    levels = levels if levels is not None else topo_levels(parent)
+
+    local = local_matrices(skel, accumulated_scale(skel, levels))
+
+    world = local.copy()
+    _compose_levels(skel, local, world, levels, root_mtx)
+
+    return world
+
+
+def _compose_levels(skel: JObjArray, local, world, levels, root_mtx=None, dirty=None):
+    """
+    fill `world` from `local`, top down. world[i] starts out as local[i].
+    with a `dirty` mask, only those joints are touched.
+    """
+    flags = skel.flags
+    parent = skel.parent_index
+    user_mtx = (flags & F_USER_MTX) != 0
+    inherits = (flags & F_MTX_INDEP_PARENT) == 0
+
+    for depth, lvl in enumerate(levels):
+        if dirty is not None:
+            lvl = lvl[dirty[lvl]]
+
+        lvl_inherit = lvl[inherits[lvl]]
+        if depth > 0:
+            world[lvl_inherit] = compose(world[parent[lvl_inherit]], local[lvl_inherit])
+        elif root_mtx is not None:
+            world[lvl_inherit] = compose(root_mtx, local[lvl_inherit])
+
+        lvl_user = lvl[user_mtx[lvl]]
+        world[lvl_user] = skel.mtx[lvl_user]
+
+
+class IncrementalFK:
+    """
+    forward_kinematics() for a skeleton that's polled every frame. keeps
+    last frame's local & world matrices and only recomputes the subtrees
+    under joints whose SRT, flags or (user) matrix changed, or that the
+    game has marked MTX_DIRTY. most of a fighter (fingers, ThrowN...)
+    sits still most of the time.
+
+    `recomputed` is how many joints the last update() actually touched.
+    """
+
+    def __init__(self, root_mtx: np.ndarray = None):
+        self.root_mtx = root_mtx
+
+        self.n = 0
+        self.levels = None
+        self.parent = None
+        self.local = None
+        self.world = None
+        self.prev_srt = None  # (N, 10) rotate|scale|translate
+        self.prev_flags = None
+        self.prev_mtx = None
+
+        self.recomputed = 0
+        self.frames = 0
+        self.total_recomputed = 0
+
+    def _reset(self, skel: JObjArray):
+        n = len(skel)
+        self.n = n
+        self.parent = skel.parent_index.copy()
+        self.levels = topo_levels(self.parent)
+        self.local = np.zeros((n, 3, 4), dtype=np.float32)
+        self.world = np.zeros((n, 3, 4), dtype=np.float32)
+        self.prev_srt = np.zeros((n, 10), dtype=np.float32)
+        self.prev_flags = np.zeros(n, dtype=np.uint32)
+        self.prev_mtx = np.zeros((n, 3, 4), dtype=np.float32)
+
+    def update(self, skel: JObjArray) -> np.ndarray:
+        """(N, 3, 4) world matrices, same as forward_kinematics(skel)"""
+        full = len(skel) != self.n or not np.array_equal(skel.parent_index, self.parent)
+        if full:
+            self._reset(skel)
+
+        srt = np.concatenate((skel.rotate, skel.scale, skel.translate), axis=1)
+        flags = skel.flags
+
+        if full:
+            dirty = np.ones(self.n, dtype=bool)
+        else:
+            dirty = (srt != self.prev_srt).any(axis=1)
+            dirty |= flags != self.prev_flags
+            dirty |= (flags & F_MTX_DIRTY) != 0
+
+            user_mtx = (flags & F_USER_MTX) != 0
+            dirty |= user_mtx & (skel.mtx != self.prev_mtx).reshape(self.n, -1).any(axis=1)
+
+            # everything under a dirty joint is dirty
+            parent = self.parent
+            for lvl in self.levels[1:]:
+                dirty[lvl] |= dirty[parent[lvl]]
+
+        self.prev_srt[:] = srt
+        self.prev_flags[:] = flags
+        self.prev_mtx[:] = skel.mtx
+
+        idx = np.flatnonzero(dirty)
+        if len(idx):
+            acc_scale = accumulated_scale(skel, self.levels)
+            self.local[idx] = local_matrices(skel, acc_scale, idx)
+            self.world[idx] = self.local[idx]
+            _compose_levels(skel, self.local, self.world, self.levels, self.root_mtx, dirty)
+
+        self.recomputed = len(idx)
+        self.frames += 1
+        self.total_recomputed += len(idx)
+
+        return self.world
+
+
+def fk_error(skel: JObjArray, world: np.ndarray) -> np.ndarray:
+    """per-joint max abs difference between `world` and the game's matrices"""
+    return np.abs(world - skel.mtx).reshape(len(skel), -1).max(axis=1)
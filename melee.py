@@ -1,14 +1,22 @@
 import struct
 from enum import IntEnum, Flag, IntFlag, auto
 from dataclasses import dataclass
+from logging import getLogger
 
 import numpy as np
 
-from memory import DOLMemory
+from memory import DOLMemory, ReadPlan, SeqlockStats, seqlock_read, GC_RAM_START, GC_RAM_END
+from schema import Schema
+
+logger = getLogger(__name__)
 
 ### addresses/constants ###
 P_PLAYER_SLOTS = 0x80453080
 PLAYER_SLOT_SIZE = 0xE90
+P_FTPARTSTABLE = 0x804D6544
+FIGHTER_SIZE = 0x23EC  # sizeof(Fighter)
+# u32, ticks once per frame (menus too); good as a PageCache epoch_addr
+P_FRAME_COUNTER = 0x80479D60
 
 
 ####
@@ -45,6 +53,32 @@ class JObj_Flags(Flag):
     ROOT_TEXEDGE = 1 << 30
 
 
+HSD_JObj = Schema(
+    "HSD_JObj",
+    [
+        ("p_next", 0x08, "u4"),
+        ("p_parent", 0x0C, "u4"),
+        ("p_child", 0x10, "u4"),
+        ("flags", 0x14, "u4"),
+        ("rotate", 0x1C, "f4", (4,)),  # Quaternion
+        ("scale", 0x2C, "f4", (3,)),  # Vec3
+        ("translate", 0x38, "f4", (3,)),  # Vec3
+        ("mtx", 0x44, "f4", (3, 4)),  # Mtx
+    ],
+)
+
+# FighterBone[], stride 0x10
+FighterBone_s = Schema(
+    "FighterBone",
+    [
+        ("p_joint", 0x0, "u4"),
+        ("p_jobj2", 0x4, "u4"),
+        ("flags", 0x8, "u1"),
+    ],
+    size=0x10,
+)
+
+
 @dataclass
 class JObj:
     flags: JObj_Flags
@@ -58,29 +92,238 @@ class JObj:
     p_parent: int
     p_child: int
 
+    @classmethod
+    def from_record(cls, rec):
+        """wrap one HSD_JObj record; the arrays are views into it"""
+        return cls(
+            flags=JObj_Flags(int(rec["flags"])),
+            rotate=rec["rotate"],
+            scale=rec["scale"],
+            translate=rec["translate"],
+            mtx=rec["mtx"],
+
+            p_next=int(rec["p_next"]),
+            p_parent=int(rec["p_parent"]),
+            p_child=int(rec["p_child"]),
+        )
+
     @classmethod
     def from_mem(cls, mem: DOLMemory, p_jobj):
-        flags = JObj_Flags(mem.readv(p_jobj + 0x14, "I"))
-        rotate = mem.readnp32(p_jobj + 0x1C, (4,))  # Quaternion
-        scale = mem.readnp32(p_jobj + 0x2C, (3,))  # Vec3
-        translate = mem.readnp32(p_jobj + 0x38, (3,))  # Vec3
-        mtx = mem.readnp32(p_jobj + 0x44, (3, 4))  # Mtx
+        return cls.from_record(HSD_JObj.read(mem, p_jobj)[0])
 
-        p_next   = mem.readv(p_jobj + 0x08, "I")
-        p_parent = mem.readv(p_jobj + 0x0c, "I")
-        p_child  = mem.readv(p_jobj + 0x10, "I")
+    @classmethod
+    def from_mem_many(cls, mem: DOLMemory, p_jobjs: list[int]) -> list["JObj"]:
+        # one sizeof(HSD_JObj) request per jobj; jobjs packed close together
+        # coalesce into even fewer reads
+        plan = ReadPlan(mem)
+        handles = [plan.add(p_jobj, HSD_JObj.size) for p_jobj in p_jobjs]
+        plan.execute()
 
-        return cls(
-            flags=flags,
-            rotate=rotate,
-            scale=scale,
-            translate=translate,
-            mtx=mtx,
-
-            p_next=p_next,
-            p_parent=p_parent,
-            p_child=p_child
-        )
+        return [cls.from_record(HSD_JObj.from_buffer(plan[h])[0]) for h in handles]
+
+
+class JObjArray:
+    """
+    structure-of-arrays snapshot of a bunch of jobjs (usually a fighter's
+    skeleton, in bone table order). float data is native f32:
+
+        rotate[N, 4]  scale[N, 3]  translate[N, 3]  mtx[N, 3, 4]  flags[N]
+
+    links are indices into the same arrays, -1 for none (or for a jobj
+    that isn't in the set): parent_index[N], first_child[N], next_sibling[N].
+
+    storage is allocated up front and reused by every update(), so polling
+    a skeleton every frame doesn't allocate per joint or per frame.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.n = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        self.capacity = capacity
+
+        self._ptrs = np.zeros(capacity, dtype=np.uint32)
+        self._flags = np.zeros(capacity, dtype=np.uint32)
+        self._rotate = np.zeros((capacity, 4), dtype=np.float32)
+        self._scale = np.zeros((capacity, 3), dtype=np.float32)
+        self._translate = np.zeros((capacity, 3), dtype=np.float32)
+        self._mtx = np.zeros((capacity, 3, 4), dtype=np.float32)
+
+        # [parent, child, next] as indices, and the raw pointers they came from
+        self._link_idx = np.full((capacity, 3), -1, dtype=np.int32)
+        self._link_ptrs = np.zeros((capacity, 3), dtype=np.uint32)
+
+        # raw HSD_JObj records land here before being split into columns
+        self._raw = bytearray(capacity * HSD_JObj.size)
+        self._recs = np.frombuffer(self._raw, dtype=HSD_JObj.dtype)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def ptrs(self) -> np.ndarray:
+        return self._ptrs[: self.n]
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self._flags[: self.n]
+
+    @property
+    def rotate(self) -> np.ndarray:
+        return self._rotate[: self.n]
+
+    @property
+    def scale(self) -> np.ndarray:
+        return self._scale[: self.n]
+
+    @property
+    def translate(self) -> np.ndarray:
+        return self._translate[: self.n]
+
+    @property
+    def mtx(self) -> np.ndarray:
+        return self._mtx[: self.n]
+
+    @property
+    def parent_index(self) -> np.ndarray:
+        return self._link_idx[: self.n, 0]
+
+    @property
+    def first_child(self) -> np.ndarray:
+        return self._link_idx[: self.n, 1]
+
+    @property
+    def next_sibling(self) -> np.ndarray:
+        return self._link_idx[: self.n, 2]
+
+    def jobj(self, idx: int) -> JObj:
+        """one joint as a plain JObj (copies), for printing & poking at"""
+        return JObj.from_record(self._recs[idx].copy())
+
+    def update(self, mem: DOLMemory, p_jobjs: list[int]) -> "JObjArray":
+        plan = ReadPlan(mem)
+        handles = self.plan_reads(plan, p_jobjs)
+        plan.execute()
+
+        return self.fill(plan, p_jobjs, handles)
+
+    def plan_reads(self, plan: ReadPlan, p_jobjs: list[int]) -> list[int]:
+        """
+        add the reads for `p_jobjs` to someone else's plan (eg. to batch
+        several skeletons); fill() with the same handles once it's run.
+        """
+        return [plan.add(p_jobj, HSD_JObj.size) for p_jobj in p_jobjs]
+
+    def fill(self, plan: ReadPlan, p_jobjs: list[int], handles: list[int]) -> "JObjArray":
+        n = len(p_jobjs)
+        if n > self.capacity:
+            self._alloc(max(n, 2 * self.capacity))
+        self.n = n
+
+        size = HSD_JObj.size
+        raw = self._raw
+        for i, h in enumerate(handles):
+            raw[i * size : (i + 1) * size] = plan[h]
+
+        recs = self._recs[:n]
+        self._ptrs[:n] = p_jobjs
+        self._flags[:n] = recs["flags"]
+        self._rotate[:n] = recs["rotate"]
+        self._scale[:n] = recs["scale"]
+        self._translate[:n] = recs["translate"]
+        self._mtx[:n] = recs["mtx"]
+
+        links = self._link_ptrs[:n]
+        if not (
+            np.array_equal(links[:, 0], recs["p_parent"])
+            and np.array_equal(links[:, 1], recs["p_child"])
+            and np.array_equal(links[:, 2], recs["p_next"])
+        ):
+            links[:, 0] = recs["p_parent"]
+            links[:, 1] = recs["p_child"]
+            links[:, 2] = recs["p_next"]
+            self._relink()
+
+        return self
+
+    def _relink(self):
+        """pointer -> index for the link columns. only needed when the tree changes"""
+        n = self.n
+        ptrs = self._ptrs[:n]
+        order = np.argsort(ptrs)
+        sorted_ptrs = ptrs[order]
+
+        links = self._link_ptrs[:n]
+        pos = np.searchsorted(sorted_ptrs, links).clip(0, max(n - 1, 0))
+        if n:
+            found = (sorted_ptrs[pos] == links) & (links != 0)
+            self._link_idx[:n] = np.where(found, order[pos], -1)
+
+
+# p_next, p_parent, p_child
+JOBJ_LINKS = struct.Struct(">III")
+
+
+def is_valid_ptr(p: int, size: int = 4) -> bool:
+    return GC_RAM_START <= p and p + size <= GC_RAM_END and p % 4 == 0
+
+
+def walk_jobj_tree(mem: DOLMemory, p_root: int, max_nodes: int = 1024) -> tuple[list[int], np.ndarray, np.ndarray]:
+    """
+    breadth first walk of the jobj tree under `p_root` along p_child/p_next.
+    returns (ptrs, parent_index, recs): every jobj, parents before children,
+    the index of each one's parent (-1 for the root and its siblings), and
+    their HSD_JObj records.
+
+    whole records for a frontier are read in one batch (the links come out
+    of those), so a fighter takes a handful of reads instead of one per
+    node and there's nothing left to read afterwards. junk pointers and
+    cycles are logged and cut off rather than followed.
+    """
+    ptrs = []
+    parents = []
+    bufs = []
+    seen = set()
+
+    frontier = [(p_root, -1)]
+    full = False
+    while frontier and not full:
+        plan = ReadPlan(mem)
+        batch = []
+        for p, parent in frontier:
+            if not is_valid_ptr(p, HSD_JObj.size):
+                logger.warning(f"jobj tree under {p_root:08x}: bad pointer {p:08x}, skipping")
+                continue
+            if p in seen:
+                logger.warning(f"jobj tree under {p_root:08x}: {p:08x} seen twice (cycle?), skipping")
+                continue
+            if len(ptrs) >= max_nodes:
+                logger.warning(f"jobj tree under {p_root:08x}: more than {max_nodes} nodes, stopping")
+                full = True
+                break
+
+            seen.add(p)
+            batch.append((len(ptrs), plan.add(p, HSD_JObj.size)))
+            ptrs.append(p)
+            parents.append(parent)
+
+        plan.execute()
+
+        frontier = []
+        for idx, h in batch:
+            bufs.append(plan[h])
+            if full:
+                continue
+
+            p_next, _, p_child = JOBJ_LINKS.unpack_from(plan[h], HSD_JObj.offset("p_next"))
+            if p_child:
+                frontier.append((p_child, idx))
+            if p_next:
+                frontier.append((p_next, parents[idx]))
+
+    recs = HSD_JObj.from_buffer(b"".join(bufs), count=len(bufs))
+    return ptrs, np.array(parents, dtype=np.int32), recs
 
 
 @dataclass
@@ -90,11 +333,13 @@ class FighterBone:
     flags: int
 
     @classmethod
-    def from_bytes(cls, buf):
-        # ignore padding junk
-        p_joint, p_jobj2, flags = struct.unpack(">IIBxxxxxxx", buf)
+    def from_record(cls, rec):
+        return cls(int(rec["p_joint"]), int(rec["p_jobj2"]), int(rec["flags"]))
 
-        return cls(p_joint, p_jobj2, flags)
+    @classmethod
+    def from_bytes(cls, buf):
+        # padding junk isn't in the schema
+        return cls.from_record(FighterBone_s.from_buffer(buf)[0])
 
 
 ###
@@ -194,37 +439,166 @@ class Fighter_Part(IntEnum):
     FtPart_109 = 109
 
 
+MAX_PARTS = Fighter_Part.FtPart_109 + 1
+
+
 ### abstraction ###
 
 pointer = int
 
 
+# FighterPartsTable** ftPartsTable
+# comes from PlCo.dat
+# indexed by fighter_kind
+# typedef struct _FighterPartsTable {
+#     u8* joint_to_part;
+#     u8* part_to_joint;
+#     u32 parts_num;
+# } FighterPartsTable;
+FighterPartsTable_s = Schema(
+    "FighterPartsTable",
+    [
+        ("joint_to_part", 0x0, "u4"),
+        ("part_to_joint", 0x4, "u4"),
+        ("parts_num", 0x8, "u4"),
+    ],
+)
+
+
+@dataclass
+class FighterPartsTable:
+    # both are read as parts_num long; a model's joints map 1:1 to parts
+    joint_to_part: np.ndarray
+    part_to_joint: np.ndarray
+    parts_num: int
+
+
+def read_parts_tables(mem: DOLMemory) -> dict[FighterKind, FighterPartsTable]:
+    """
+    every FighterKind's parts table, in two batched passes (the entries,
+    then the u8 tables they point to). kinds without one are left out.
+    """
+    ftPartsTable = mem.readv(P_FTPARTSTABLE, "I")
+    if not is_valid_ptr(ftPartsTable):
+        logger.warning(f"ftPartsTable isn't loaded yet ({ftPartsTable:08x})")
+        return {}
+
+    kinds = list(FighterKind)[: FighterKind.FTKIND_MAX]
+    p_entries = struct.unpack(f">{len(kinds)}I", mem.read(ftPartsTable, 4 * len(kinds)))
+
+    plan = ReadPlan(mem)
+    handles = {
+        kind: plan.add(p_entry, FighterPartsTable_s.size)
+        for kind, p_entry in zip(kinds, p_entries)
+        if is_valid_ptr(p_entry, FighterPartsTable_s.size)
+    }
+    plan.execute()
+    entries = {kind: FighterPartsTable_s.from_buffer(plan[h])[0] for kind, h in handles.items()}
+
+    plan = ReadPlan(mem)
+    handles = {
+        kind: (
+            plan.add(int(entry["joint_to_part"]), int(entry["parts_num"])),
+            plan.add(int(entry["part_to_joint"]), int(entry["parts_num"])),
+        )
+        for kind, entry in entries.items()
+        if is_valid_ptr(int(entry["joint_to_part"]), int(entry["parts_num"]))
+        and is_valid_ptr(int(entry["part_to_joint"]), int(entry["parts_num"]))
+    }
+    plan.execute()
+
+    return {
+        kind: FighterPartsTable(
+            joint_to_part=np.frombuffer(plan[h_j2p], dtype=np.uint8),
+            part_to_joint=np.frombuffer(plan[h_p2j], dtype=np.uint8),
+            parts_num=int(entries[kind]["parts_num"]),
+        )
+        for kind, (h_j2p, h_p2j) in handles.items()
+    }
+
+
+@dataclass
+class FighterMeta:
+    """
+    stuff about a fighter that doesn't change until the character (or the
+    scene) does. valid for as long as the slot's fighter GObj, Fighter and
+    character stay the same (GObjs get reused from match to match).
+    """
+
+    slot: int
+    p_Fighter_GObj: pointer
+    p_Fighter: pointer
+    kind: FighterKind
+    parts_num: int
+    p_bone_table: pointer
+    parts: FighterPartsTable = None
+    p_joints: list[pointer] = None  # filled in on first read_skeleton()
+    nana: bool = False
+    character: int = None  # external id, as the slot's StaticPlayer has it
+
+    @property
+    def key(self) -> tuple[int, pointer, FighterKind]:
+        return (self.slot, self.p_Fighter, self.kind)
+
+
+# only what we use; the rest of the 0xE90 is still a mystery box
+StaticPlayer_s = Schema(
+    "StaticPlayer",
+    [
+        ("character", 0x4, "u4"),  # external id
+        ("p_Fighter_GObj", 0xB0, "u4"),
+        ("p_Nana_GObj", 0xB4, "u4"),  # ice climbers' second fighter
+    ],
+    size=PLAYER_SLOT_SIZE,
+)
+N_PLAYER_SLOTS = 4
+
+
+@dataclass
+class PlayerSnapshot:
+    meta: FighterMeta
+    skeleton: JObjArray
+
+
+@dataclass
+class GameSnapshot:
+    frame: int
+    # raw StaticPlayer records for all slots (view of the one block read)
+    static_players: np.ndarray
+    # keyed on (slot, is_nana); empty slots are left out
+    players: dict[tuple[int, bool], PlayerSnapshot]
+    # frame counter moved under us on every attempt; may mix two frames
+    torn: bool = False
+
+
 class Fighter:
-    def __init__(self, mem: DOLMemory, p_Fighter: pointer):
+    def __init__(self, mem: DOLMemory, p_Fighter: pointer, meta: FighterMeta = None):
         self.mem = mem
         self.ptr = p_Fighter
+        self.meta = meta
 
     @property
     def kind(self) -> FighterKind:
+        if self.meta:
+            return self.meta.kind
+
         return FighterKind(self.mem.readv(self.ptr + 0x4, "I"))
 
     def parts_count(self) -> int:
-        ftPartsTable = self.mem.readv(0x804D6544, "I")
-
-        # FighterPartsTable** ftPartsTable
-        # comes from PlCo.dat
-        # indexed by fighter_kind
-        # typedef struct _FighterPartsTable {
-        #     u8* joint_to_part;
-        #     u8* part_to_joint;
-        #     u32 parts_num;
-        # } FighterPartsTable;
+        if self.meta:
+            return self.meta.parts_num
 
+        ftPartsTable = self.mem.readv(P_FTPARTSTABLE, "I")
         fighter_ftParts = self.mem.readv(ftPartsTable + self.kind * 4, "I")
         parts_num = self.mem.readv(fighter_ftParts + 0x8, "I")
 
         return parts_num
 
+    def _p_bone_table(self) -> pointer:
+        if self.meta:
+            return self.meta.p_bone_table
+
+        return self.mem.readv(self.ptr + 0x5E8, "I")
 
     def get_fighterbones(self) -> list[FighterBone]:
         parts_num = self.parts_count()
@@ -232,28 +606,191 @@ class Fighter:
         ## bone table
         # FighterBone[]
         # sizeof(FighterBone) == 0x10
-        p_bone_table = self.mem.readv(self.ptr + 0x5E8, "I")
+        p_bone_table = self._p_bone_table()
 
-        parts = [
-            FighterBone.from_bytes(self.mem.read(p_bone_table + idx * 0x10, 0x10))
-            for idx in range(parts_num)
-        ]
+        recs = FighterBone_s.read(self.mem, p_bone_table, count=parts_num)
+        parts = [FighterBone.from_record(rec) for rec in recs]
 
         return parts
 
+    def read_skeleton(self, out: JObjArray = None) -> JObjArray:
+        """
+        every bone's jobj, in bone table order. pass last frame's `out`
+        back in to reuse its storage.
+        """
+        p_joints = self.meta and self.meta.p_joints
+        if not p_joints:
+            recs = FighterBone_s.read(self.mem, self._p_bone_table(), count=self.parts_count())
+            p_joints = recs["p_joint"].tolist()
+            if self.meta:
+                self.meta.p_joints = p_joints
+
+        if out is None:
+            out = JObjArray(len(p_joints))
+        return out.update(self.mem, p_joints)
+
 class Melee:
-    def __init__(self, mem: DOLMemory):
+    def __init__(self, mem: DOLMemory, preload: bool = True):
         self.mem = mem
 
-    def _get_p_Fighter(self, slot: int) -> pointer:
-        slot = 0
+        self._meta = {}  # slot -> FighterMeta
+        self.seqlock_stats = SeqlockStats()
+        self.parts_tables = read_parts_tables(mem) if preload else {}
+
+    def fighter_meta(
+        self,
+        slot: int,
+        nana: bool = False,
+        p_Fighter_GObj: pointer = None,
+        p_Fighter: pointer = None,
+        character: int = None,
+    ) -> FighterMeta | None:
+        """
+        memoized per slot. the slot's fighter GObj, its Fighter and the
+        slot's (external) character are read to check the memo is still
+        good (none of them if you already have them); if anything moved,
+        everything is looked up again.
+
+        None if the slot has no fighter, or one that's only half there
+        (scene loads, character changes); the memo for it is dropped.
+        """
         p_StaticPlayer = P_PLAYER_SLOTS + PLAYER_SLOT_SIZE * slot
+        if p_Fighter_GObj is None:
+            field = "p_Nana_GObj" if nana else "p_Fighter_GObj"
+            p_Fighter_GObj = self.mem.readv(p_StaticPlayer + StaticPlayer_s.offset(field), "I")
+        if not is_valid_ptr(p_Fighter_GObj, 0x30):
+            return self._no_fighter(slot, nana, f"GObj {p_Fighter_GObj:#x}")
+        if p_Fighter is None:
+            p_Fighter = self.mem.readv(p_Fighter_GObj + 0x2C, "I")
+        if character is None:
+            character = self.mem.readv(p_StaticPlayer + StaticPlayer_s.offset("character"), "I")
+
+        meta = self._meta.get((slot, nana))
+        if meta and (meta.p_Fighter_GObj, meta.p_Fighter, meta.character) == (p_Fighter_GObj, p_Fighter, character):
+            return meta
+
+        if meta:
+            logger.debug(f"slot {slot}{' (nana)' if nana else ''}: {meta.key} went stale")
+        if not is_valid_ptr(p_Fighter, FIGHTER_SIZE):
+            return self._no_fighter(slot, nana, f"Fighter {p_Fighter:#x}")
+
+        kind = self.mem.readv(p_Fighter + 0x4, "I")
+        if not 0 <= kind < FighterKind.FTKIND_MAX:
+            return self._no_fighter(slot, nana, f"kind {kind:#x}")
+        kind = FighterKind(kind)
+
+        if kind not in self.parts_tables:
+            # too early for the preload, or a kind it couldn't read
+            self.parts_tables = read_parts_tables(self.mem)
+        parts = self.parts_tables.get(kind)
+        if parts is None:
+            return self._no_fighter(slot, nana, f"no parts table for {kind!r}")
+
+        p_bone_table = self.mem.readv(p_Fighter + 0x5E8, "I")
+        if not 0 < parts.parts_num <= MAX_PARTS:
+            return self._no_fighter(slot, nana, f"parts_num {parts.parts_num}")
+        if not is_valid_ptr(p_bone_table, FighterBone_s.size * parts.parts_num):
+            return self._no_fighter(slot, nana, f"bone table {p_bone_table:#x}")
+
+        meta = FighterMeta(
+            slot=slot,
+            p_Fighter_GObj=p_Fighter_GObj,
+            p_Fighter=p_Fighter,
+            kind=kind,
+            parts_num=parts.parts_num,
+            p_bone_table=p_bone_table,
+            parts=parts,
+            nana=nana,
+            character=character,
+        )
+        logger.debug(f"slot {slot}{' (nana)' if nana else ''}: new fighter {meta.key}")
+
+        self._meta[(slot, nana)] = meta
+        return meta
+
+    def _no_fighter(self, slot: int, nana: bool, why: str) -> None:
+        if self._meta.pop((slot, nana), None):
+            logger.debug(f"slot {slot}{' (nana)' if nana else ''}: fighter went away ({why})")
+        return None
 
-        p_p_Fighter_GObj = p_StaticPlayer + 0xB0
-        p_Fighter_GObj = self.mem.readv(p_p_Fighter_GObj, "I")
-        p_Fighter = self.mem.readv(p_Fighter_GObj + 0x2C, "I")
+    def get_fighter(self, slot: int, nana: bool = False) -> Fighter:
+        meta = self.fighter_meta(slot, nana)
+        if meta is None:
+            raise ValueError(f"slot {slot}{' (nana)' if nana else ''}: no fighter (yet)")
 
-        return p_Fighter
+        return Fighter(self.mem, meta.p_Fighter, meta)
 
-    def get_fighter(self, slot: int) -> Fighter:
-        return Fighter(self.mem, self._get_p_Fighter(slot))
+    def snapshot(self, out: GameSnapshot = None, max_retries: int = 2) -> GameSnapshot:
+        """
+        every fighter in every slot (nana too), read together:
+
+          - one batch for the frame counter and the whole StaticPlayer block
+          - metadata from fighter_meta(), which is free unless a slot changed
+          - one batch for all the skeletons
+
+        the lot is bracketed by reads of P_FRAME_COUNTER (see seqlock_read)
+        and retried if a frame boundary fell inside it; if that keeps
+        happening it comes back with torn=True. rates in self.seqlock_stats.
+
+        pass the previous snapshot as `out` to reuse its skeleton storage.
+        """
+        snapshot, torn = seqlock_read(
+            self.mem, P_FRAME_COUNTER, lambda: self._snapshot(out), max_retries, self.seqlock_stats
+        )
+        snapshot.torn = torn
+
+        return snapshot
+
+    def _snapshot(self, out: GameSnapshot = None) -> GameSnapshot:
+        plan = ReadPlan(self.mem)
+        h_frame = plan.add(P_FRAME_COUNTER, 4)
+        h_slots = plan.add(P_PLAYER_SLOTS, PLAYER_SLOT_SIZE * N_PLAYER_SLOTS)
+        plan.execute()
+
+        frame = struct.unpack(">I", plan[h_frame])[0]
+        static_players = StaticPlayer_s.from_buffer(plan[h_slots], count=N_PLAYER_SLOTS)
+
+        # every fighter's Fighter pointer in one go, to check the memos against
+        present = []
+        plan = ReadPlan(self.mem)
+        for slot, rec in enumerate(static_players):
+            for nana, field in ((False, "p_Fighter_GObj"), (True, "p_Nana_GObj")):
+                p_gobj = int(rec[field])
+                if is_valid_ptr(p_gobj, 0x30):
+                    present.append((slot, nana, p_gobj, int(rec["character"]), plan.add(p_gobj + 0x2C, 4)))
+                else:
+                    self._meta.pop((slot, nana), None)
+        plan.execute()
+
+        metas = []
+        for slot, nana, p_gobj, character, h in present:
+            p_Fighter = struct.unpack(">I", plan[h])[0]
+            meta = self.fighter_meta(slot, nana, p_gobj, p_Fighter, character)
+            if meta is not None:
+                metas.append(meta)
+
+        # bone tables for anyone new, all at once
+        new = [meta for meta in metas if not meta.p_joints]
+        if new:
+            plan = ReadPlan(self.mem)
+            handles = [plan.add(meta.p_bone_table, FighterBone_s.size * meta.parts_num) for meta in new]
+            plan.execute()
+            for meta, h in zip(new, handles):
+                recs = FighterBone_s.from_buffer(plan[h], count=meta.parts_num)
+                meta.p_joints = recs["p_joint"].tolist()
+
+        old_players = out.players if out else {}
+        plan = ReadPlan(self.mem)
+        pending = []
+        for meta in metas:
+            key = (meta.slot, meta.nana)
+            skeleton = old_players[key].skeleton if key in old_players else JObjArray(meta.parts_num)
+            pending.append((meta, skeleton, skeleton.plan_reads(plan, meta.p_joints)))
+        plan.execute()
+
+        players = {}
+        for meta, skeleton, handles in pending:
+            skeleton.fill(plan, meta.p_joints, handles)
+            players[(meta.slot, meta.nana)] = PlayerSnapshot(meta=meta, skeleton=skeleton)
+
+        return GameSnapshot(frame=frame, static_players=static_players, players=players)
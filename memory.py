@@ -1,7 +1,12 @@
-from logging import getLogger
+from logging import getLogger, DEBUG
+from abc import ABC, abstractmethod
+import sys
+import math
 import struct
+import time
 import ctypes
-from ctypes import windll, WinError
+from collections import OrderedDict
+from dataclasses import dataclass
 from ctypes import Structure, Union, sizeof, pointer
 from ctypes import c_char, c_ulong, c_long, c_size_t, c_void_p
 from ctypes.wintypes import DWORD, WORD, LPCVOID
@@ -10,16 +15,50 @@ import numpy as np
 
 from win32ty import *
 
-logger = getLogger(__name__)
+if sys.platform == "win32":
+    from ctypes import windll, WinError
+
+    kernel32 = windll.kernel32
+    psapi = windll.psapi
 
-kernel32 = windll.kernel32
-psapi = windll.psapi
+logger = getLogger(__name__)
 
 # DOL/RVL stuff
 GC_RAM_START = 0x80000000
 GC_RAM_END = 0x81800000
 GC_RAM_SIZE = 0x2000000
 
+# reads closer together than this get merged into one; a few hundred extra
+# bytes are way cheaper than another round trip into the other process
+READ_COALESCE_GAP = 0x100
+
+
+class MemoryBackend(ABC):
+    """
+    something that can read emulated RAM. offsets are relative to the
+    start of GC RAM (ie. `addr - GC_RAM_START`), never virtual addresses.
+
+    reads hand back any bytes-like object (bytes, memoryview...);
+    callers should treat it as read-only.
+
+    `syscalls` counts round trips into the target process, for ReadStats.
+    """
+
+    syscalls = 0
+
+    @abstractmethod
+    def read(self, offset: int, size: int): ...
+
+    def read_many(self, ranges: list[tuple[int, int]]) -> list:
+        """
+        read a list of (offset, size) ranges. backends that can do
+        scatter/gather override this to do it in fewer syscalls.
+        """
+        return [self.read(offset, size) for offset, size in ranges]
+
+    def close(self):
+        pass
+
 
 def _get_dolphin_proc_handle():
     hProcessSnap = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
@@ -93,22 +132,18 @@ def _find_dol_ram_region(hProc):
                     return (base, size)
 
 
-class DOLMemory:
+class Win32ProcessBackend(MemoryBackend):
     def __init__(self):
         self.hProc = _get_dolphin_proc_handle()
         self.dol_ram_base, self.dol_ram_size = _find_dol_ram_region(self.hProc)
 
-    def read(self, addr, size):
+    def read(self, offset, size):
         buf = ctypes.create_string_buffer(size)
 
-        if addr >= GC_RAM_START and addr <= GC_RAM_END:
-            offset = addr % GC_RAM_START
-        else:
-            raise ValueError(f"invalid read location: {addr:x}")
-
         vaddr = self.dol_ram_base + offset
         read_bytes = c_size_t(0)
 
+        self.syscalls += 1
         ret = kernel32.ReadProcessMemory(
             self.hProc, vaddr, buf, size, pointer(read_bytes)
         )
@@ -119,10 +154,516 @@ class DOLMemory:
             raise RuntimeError(f"asked for {size} bytes, only read {read_bytes}")
             # raise RuntimeError(f'read from {addr:x} (process addr {vaddr:x}) failed')
 
-        logger.debug(f"read {read_bytes.value}bytes from {addr:08x}")
-
         return ctypes.string_at(buf, size=size)
 
+    def close(self):
+        if self.hProc:
+            kernel32.CloseHandle(self.hProc)
+            self.hProc = None
+
+
+def default_backend() -> MemoryBackend:
+    """attach to a running dolphin with whatever works on this platform"""
+    if sys.platform == "win32":
+        return Win32ProcessBackend()
+    elif sys.platform.startswith("linux"):
+        from memory_linux import LinuxProcessBackend
+
+        return LinuxProcessBackend()
+    else:
+        raise NotImplementedError(f"no dolphin memory backend for {sys.platform}")
+
+
+@dataclass
+class ReadStats:
+    requests: int = 0  # reads callers asked for
+    ranges: int = 0  # reads actually issued to the backend, after coalescing
+    bytes_requested: int = 0
+    bytes_read: int = 0  # includes the gaps we read through when merging
+    polls: int = 0  # read_direct()s; they hit the backend but aren't requests
+
+    @property
+    def coalesced(self) -> int:
+        return self.requests - self.ranges
+
+
+# log2 buckets of microseconds: <1us, <2us, <4us ... everything past ~8s in the last
+LATENCY_BUCKETS = 24
+
+# the DOLMemory entry points everything goes through; read_many() & readv()
+# land in these too
+PROFILED_METHODS = ("read", "read_direct", "_read_ranges")
+
+# frames from these are plumbing, not call sites
+PROFILER_SKIP_MODULES = {__name__, "schema"}
+
+
+@dataclass
+class SiteStats:
+    calls: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+class ReadProfiler:
+    """
+    accounting of reads through one DOLMemory: calls and bytes (per entry
+    point and per call site), a latency histogram, and the cache's hit
+    rate and backend syscalls over the same stretch. the call site is the
+    first function up the stack that isn't memory.py or schema.py
+    plumbing, eg. "melee:JObj.from_mem".
+
+    every `log_interval` seconds (if nonzero) there's a one-line summary
+    at INFO; snapshot() has the numbers, report() a table.
+    """
+
+    def __init__(self, mem: "DOLMemory", log_interval: float = 10.0):
+        self.mem = mem
+        self.log_interval = log_interval
+
+        self.calls = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.kinds = {name: SiteStats() for name in PROFILED_METHODS}
+        self.sites = {}
+        self.latency = [0] * LATENCY_BUCKETS
+
+        self.started = time.perf_counter()
+        self._last_log = self.started
+        self._last_log_calls = 0
+        self._cache_base = (mem.cache.hits, mem.cache.misses) if mem.cache else (0, 0)
+        self._syscalls_base = mem.backend.syscalls
+
+    def wrap(self, fn, kind: str):
+        record = self.record
+
+        def profiled(*args, **kwargs):
+            t = time.perf_counter_ns()
+            out = fn(*args, **kwargs)
+            elapsed = time.perf_counter_ns() - t
+
+            if kind == "_read_ranges":
+                nbytes = sum(size for _, size in (args[0] if args else kwargs["ranges"]))
+            else:
+                nbytes = args[1] if len(args) > 1 else kwargs["size"]
+            record(kind, nbytes, elapsed)
+            return out
+
+        profiled.__wrapped__ = fn
+        return profiled
+
+    def record(self, kind: str, nbytes: int, elapsed_ns: int):
+        seconds = elapsed_ns / 1e9
+        self.calls += 1
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.latency[min((elapsed_ns // 1000).bit_length(), LATENCY_BUCKETS - 1)] += 1
+
+        k = self.kinds[kind]
+        k.calls += 1
+        k.bytes += nbytes
+        k.seconds += seconds
+
+        # record() <- profiled() <- whoever
+        f = sys._getframe(2)
+        while f is not None and f.f_globals.get("__name__") in PROFILER_SKIP_MODULES:
+            f = f.f_back
+        site = f"{f.f_globals.get('__name__')}:{f.f_code.co_qualname}" if f else "?"
+
+        s = self.sites.get(site)
+        if s is None:
+            s = self.sites[site] = SiteStats()
+        s.calls += 1
+        s.bytes += nbytes
+        s.seconds += seconds
+
+        if self.log_interval:
+            now = time.perf_counter()
+            if now - self._last_log >= self.log_interval:
+                self._log(now)
+
+    @property
+    def cache_hits(self) -> int:
+        return self.mem.cache.hits - self._cache_base[0] if self.mem.cache else 0
+
+    @property
+    def cache_misses(self) -> int:
+        return self.mem.cache.misses - self._cache_base[1] if self.mem.cache else 0
+
+    @property
+    def syscalls(self) -> int:
+        return self.mem.backend.syscalls - self._syscalls_base
+
+    def percentile(self, q: float) -> float:
+        """latency (seconds) that a fraction q of calls came in under, to the bucket"""
+        target = q * self.calls
+        seen = 0
+        for i, n in enumerate(self.latency):
+            seen += n
+            if n and seen >= target:
+                return (1 << i) / 1e6
+        return 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "elapsed": time.perf_counter() - self.started,
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "seconds": self.seconds,
+            "syscalls": self.syscalls,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "latency_us": {1 << i: n for i, n in enumerate(self.latency) if n},  # bucket upper bound -> calls
+            "kinds": {k: vars(v).copy() for k, v in self.kinds.items()},
+            "sites": {k: vars(v).copy() for k, v in self.sites.items()},
+        }
+
+    def _summary(self, calls_per_s: float) -> str:
+        pages = self.cache_hits + self.cache_misses
+        cache = f", cache {self.cache_hits / pages:.0%} hit" if pages else ""
+        top = max(self.sites.items(), key=lambda kv: kv[1].seconds, default=None)
+        top = f", most time in {top[0]} ({top[1].seconds / self.seconds:.0%})" if top and self.seconds else ""
+
+        return (
+            f"reads: {self.calls} calls ({calls_per_s:.0f}/s), {self.bytes / 1024:.0f}KiB, "
+            f"{self.seconds * 1e3:.1f}ms total, p50 <{self.percentile(0.5) * 1e6:.0f}us "
+            f"p99 <{self.percentile(0.99) * 1e6:.0f}us, {self.syscalls} syscalls{cache}{top}"
+        )
+
+    def _log(self, now: float):
+        rate = (self.calls - self._last_log_calls) / (now - self._last_log)
+        self._last_log, self._last_log_calls = now, self.calls
+        logger.info(self._summary(rate))
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        lines = [self._summary(self.calls / elapsed if elapsed else 0.0), ""]
+
+        lines.append(f"{'site':48} {'calls':>8} {'bytes':>10} {'ms':>9}")
+        for site, s in sorted(self.sites.items(), key=lambda kv: -kv[1].seconds):
+            lines.append(f"{site:48} {s.calls:8} {s.bytes:10} {s.seconds * 1e3:9.2f}")
+
+        lines.append("")
+        lines.append("latency")
+        width = max(self.latency)
+        for i, n in enumerate(self.latency):
+            if n:
+                lines.append(f"  <{1 << i:>8}us {n:8} {'#' * max(1, 40 * n // width)}")
+
+        return "\n".join(lines)
+
+
+class ReadPlan:
+    """
+    a deferred batch of reads. add() everything you're going to need,
+    execute() once, then index the plan with the handles add() gave back.
+
+    requests are sorted and merged when they overlap or are within `max_gap`
+    bytes of each other, and all merged ranges go to the backend in a single
+    read_many(). results are memoryview slices of the merged reads.
+    """
+
+    def __init__(self, mem: "DOLMemory", max_gap: int = READ_COALESCE_GAP):
+        self.mem = mem
+        self.max_gap = max_gap
+        self.requests = []
+        self.results = None
+
+    def __len__(self):
+        return len(self.requests)
+
+    def add(self, addr: int, size: int) -> int:
+        self.requests.append((addr, size))
+        return len(self.requests) - 1
+
+    def execute(self) -> list[memoryview]:
+        order = sorted(range(len(self.requests)), key=lambda i: self.requests[i][0])
+
+        merged = []  # [start, end) pairs
+        owner = [0] * len(self.requests)
+        for i in order:
+            addr, size = self.requests[i]
+            if merged and addr <= merged[-1][1] + self.max_gap:
+                merged[-1][1] = max(merged[-1][1], addr + size)
+            else:
+                merged.append([addr, addr + size])
+            owner[i] = len(merged) - 1
+
+        bufs = self.mem._read_ranges([(start, end - start) for start, end in merged])
+        views = [memoryview(buf) for buf in bufs]
+
+        self.results = []
+        for (addr, size), m in zip(self.requests, owner):
+            rel = addr - merged[m][0]
+            self.results.append(views[m][rel : rel + size])
+
+        stats = self.mem.stats
+        stats.requests += len(self.requests)
+        stats.ranges += len(merged)
+        stats.bytes_requested += sum(size for _, size in self.requests)
+        stats.bytes_read += sum(end - start for start, end in merged)
+
+        return self.results
+
+    def __getitem__(self, handle: int) -> memoryview:
+        return self.results[handle]
+
+
+@dataclass
+class SeqlockStats:
+    reads: int = 0
+    retries: int = 0
+    torn: int = 0  # gave up, returned data that may mix two frames
+
+    @property
+    def retry_rate(self) -> float:
+        return self.retries / self.reads if self.reads else 0.0
+
+    @property
+    def torn_rate(self) -> float:
+        return self.torn / self.reads if self.reads else 0.0
+
+
+def seqlock_read(mem, seq_addr: int, fn, max_retries: int = 2, stats: SeqlockStats = None):
+    """
+    run `fn()` (some batch of reads from `mem`) between two reads of the
+    u32 at `seq_addr`, usually the frame counter. if it moved, the game
+    wrote while we were reading, so try again, up to `max_retries` times.
+
+    returns (fn's result, torn); torn means every attempt straddled a frame.
+    dolphin never has to be paused for this.
+    """
+    stats = stats if stats is not None else SeqlockStats()
+    stats.reads += 1
+
+    for attempt in range(max_retries + 1):
+        if attempt:
+            stats.retries += 1
+
+        before = mem.read_direct(seq_addr, 4)
+        # anything cached under some other counter value is from another
+        # frame, and would sail through the check below
+        mem.sync_epoch(seq_addr, bytes(before))
+        result = fn()
+        after = mem.read_direct(seq_addr, 4)
+
+        if bytes(before) == bytes(after):
+            return result, False
+
+    stats.torn += 1
+    logger.debug("torn read: %08x kept moving over %d attempts", seq_addr, max_retries + 1)
+    return result, True
+
+
+class PageCache:
+    """
+    read-through, page granular LRU cache of emulated RAM, for use by
+    DOLMemory. everything in it is from the current epoch (~frame); once
+    the game moves on it's all thrown out.
+
+    if `epoch_addr` is given, it's a big endian u32 that changes once per
+    frame (eg. melee.P_FRAME_COUNTER). DOLMemory polls it at most every
+    `epoch_poll` seconds and starts a new epoch when it moves.
+
+    reads within a single page are memoryview slices of the cached page;
+    reads straddling pages have to be stitched together (one copy).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 0x400000,
+        page_size: int = 0x1000,
+        epoch_addr: int = None,
+        epoch_poll: float = 0.001,
+    ):
+        assert page_size & (page_size - 1) == 0, "page_size must be a power of 2"
+        self.page_size = page_size
+        self.max_pages = max(1, max_bytes // page_size)
+        self.epoch_addr = epoch_addr
+        self.epoch_poll = epoch_poll
+
+        self.pages = OrderedDict()  # page index -> memoryview
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.pages) * self.page_size
+
+    def clear(self):
+        self.pages.clear()
+
+    def _fill(self, backend: MemoryBackend, wanted: list[int]):
+        """fetch the pages in sorted `wanted` that we don't have, contiguous runs as one range"""
+        ps = self.page_size
+        missing = [p for p in wanted if p not in self.pages]
+        self.misses += len(missing)
+        self.hits += len(wanted) - len(missing)
+        if not missing:
+            return
+
+        runs = []  # [first page, page count]
+        for p in missing:
+            if runs and runs[-1][0] + runs[-1][1] == p:
+                runs[-1][1] += 1
+            else:
+                runs.append([p, 1])
+
+        bufs = backend.read_many([(first * ps, count * ps) for first, count in runs])
+        for (first, count), buf in zip(runs, bufs):
+            view = memoryview(buf)
+            for i in range(count):
+                self.pages[first + i] = view[i * ps : (i + 1) * ps]
+
+    def read_many(self, backend: MemoryBackend, ranges: list[tuple[int, int]]) -> list:
+        ps = self.page_size
+        spans = [(off // ps, (off + max(size, 1) - 1) // ps) for off, size in ranges]
+        wanted = sorted({p for first, last in spans for p in range(first, last + 1)})
+
+        self._fill(backend, wanted)
+
+        # hold our own refs; a batch bigger than the cache evicts its own pages
+        pages = {p: self.pages[p] for p in wanted}
+        for p in wanted:
+            self.pages.move_to_end(p)
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+            self.evictions += 1
+
+        out = []
+        for (off, size), (first, last) in zip(ranges, spans):
+            rel = off - first * ps
+            if first == last:
+                out.append(pages[first][rel : rel + size])
+            else:
+                stitched = b"".join(pages[p] for p in range(first, last + 1))
+                out.append(memoryview(stitched)[rel : rel + size])
+
+        return out
+
+
+class DOLMemory:
+    def __init__(self, backend: MemoryBackend = None, cache: PageCache = None):
+        self.backend = backend or default_backend()
+        self.stats = ReadStats()
+
+        self.cache = cache
+        self.epoch = 0
+        # (addr, value) of the counter the cache was last filled under
+        self._epoch_key = None
+        self._epoch_checked = 0.0
+
+        # a symbols.SymbolMap, to say what reads are of in debug logs
+        self.symbols = None
+        self.profiler = None
+
+    def enable_profiling(self, log_interval: float = 10.0) -> "ReadProfiler":
+        """
+        start accounting for every read (see ReadProfiler). the read
+        methods get wrapped on this instance only; until then (and after
+        disable_profiling()) they're the plain ones, no checks.
+        """
+        if self.profiler is None:
+            self.profiler = ReadProfiler(self, log_interval)
+            for name in PROFILED_METHODS:
+                setattr(self, name, self.profiler.wrap(getattr(self, name), name))
+
+        return self.profiler
+
+    def disable_profiling(self):
+        for name in PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+        self.profiler = None
+
+    def new_epoch(self):
+        """forget everything cached; call when the game state has moved on"""
+        self.epoch += 1
+        if self.cache:
+            self.cache.clear()
+
+    def sync_epoch(self, addr: int, value):
+        """start a new epoch unless the cache was filled while the counter at `addr` read `value`"""
+        if (addr, value) != self._epoch_key:
+            self._epoch_key = (addr, value)
+            self.new_epoch()
+
+    def _check_epoch(self):
+        cache = self.cache
+        if cache.epoch_addr is None:
+            return
+
+        now = time.perf_counter()
+        if now - self._epoch_checked < cache.epoch_poll:
+            return
+        self._epoch_checked = now
+
+        # the counter itself must never be cached
+        self.sync_epoch(cache.epoch_addr, bytes(self.read_direct(cache.epoch_addr, 4)))
+
+    def _backend_read_many(self, ranges: list[tuple[int, int]]) -> list:
+        if self.cache:
+            self._check_epoch()
+            return self.cache.read_many(self.backend, ranges)
+        else:
+            return self.backend.read_many(ranges)
+
+    @property
+    def syscalls(self) -> int:
+        return self.backend.syscalls
+
+    @property
+    def syscalls_saved(self) -> int:
+        # polls are one syscall each and never could have been saved
+        return self.stats.requests - (self.backend.syscalls - self.stats.polls)
+
+    @staticmethod
+    def _offset(addr: int) -> int:
+        if addr >= GC_RAM_START and addr <= GC_RAM_END:
+            return addr % GC_RAM_START
+        else:
+            raise ValueError(f"invalid read location: {addr:x}")
+
+    def _read_ranges(self, ranges: list[tuple[int, int]]) -> list:
+        bufs = self._backend_read_many([(self._offset(addr), size) for addr, size in ranges])
+
+        logger.debug("read %d ranges (%dbytes)", len(ranges), sum(size for _, size in ranges))
+
+        return bufs
+
+    def read(self, addr, size):
+        offset = self._offset(addr)
+
+        if self.cache:
+            buf = self._backend_read_many([(offset, size)])[0]
+        else:
+            buf = self.backend.read(offset, size)
+
+        self.stats.requests += 1
+        self.stats.ranges += 1
+        self.stats.bytes_requested += size
+        self.stats.bytes_read += size
+
+        if self.symbols is None:
+            logger.debug("read %dbytes from %08x", size, addr)
+        elif logger.isEnabledFor(DEBUG):
+            logger.debug("read %dbytes from %08x (%s)", size, addr, self.symbols.format(addr))
+
+        return buf
+
+    def read_direct(self, addr, size):
+        """straight from the backend, skipping the cache. for polling; counted in stats.polls only"""
+        self.stats.polls += 1
+        return self.backend.read(self._offset(addr), size)
+
+    def read_many(self, ranges: list[tuple[int, int]], max_gap: int = READ_COALESCE_GAP) -> list[memoryview]:
+        """read a bunch of (addr, size) ranges in as few reads as possible. see ReadPlan"""
+        plan = ReadPlan(self, max_gap=max_gap)
+        for addr, size in ranges:
+            plan.add(addr, size)
+
+        return plan.execute()
+
     def readv(self, ptr: int, fmt: str, size: int = None):
         """
         read a value with given struct 'fmt'. implicitly big endian.
@@ -152,8 +693,13 @@ class DOLMemory:
         """
         read a packed fp32 array of a given shape into an np.ndarray.
         assumes contiguity/no intra-array padding
+
+        the result is a read-only big endian view over whatever the
+        backend handed back (no copy); .astype() it if u need to write.
         """
 
-        nw = int(np.prod(shape))
-        vals = struct.unpack(f">{nw}f", self.read(ptr, 4 * nw))
-        return np.array(vals).reshape(shape)
+        nw = math.prod(shape)
+        return np.frombuffer(self.read(ptr, 4 * nw), dtype=">f4").reshape(shape)
+
+    def close(self):
+        self.backend.close()
@@ -1,30 +1,139 @@
 import os
 
+import numpy as np
+
+BPL = 16  # 16 bytes per line
+
+
+def _printable(x):
+    return 32 <= x < 127
+
+
+# the fast path fills in whole blocks of fixed width lines at once:
+# "aaaaaaaa  hh hh .. hh  hh hh .. hh  |cccccccccccccccc|\n"
+LINE_WIDTH = 79
+_TEMPLATE = np.frombuffer(b" " * 60 + b"|" + b" " * 16 + b"|\n", dtype=np.uint8)
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_ASCII = np.array([x if _printable(x) else ord(".") for x in range(256)], dtype=np.uint8)
+_ADDR_SHIFTS = np.arange(28, -1, -4)
+_HEX_COLS = np.array([10 + 3 * j + (j >= 8) for j in range(BPL)])
+_ASCII_COL = 61
+
+
+def _format_lines(rows: np.ndarray, addrs: np.ndarray) -> np.ndarray:
+    """(L, 16) bytes and their addresses -> (L, LINE_WIDTH) formatted lines"""
+    out = np.empty((len(rows), LINE_WIDTH), dtype=np.uint8)
+    out[:] = _TEMPLATE
+    out[:, :8] = _HEX[(addrs[:, None] >> _ADDR_SHIFTS) & 0xF]
+    out[:, _HEX_COLS] = _HEX[rows >> 4]
+    out[:, _HEX_COLS + 1] = _HEX[rows & 0xF]
+    out[:, _ASCII_COL : _ASCII_COL + BPL] = _ASCII[rows]
+
+    return out
+
 
 class hexdump:
-    def __init__(self, buf, base_addr=0x0):
+    def __init__(self, buf, base_addr=0x0, symbols=None):
         self.buf = buf
         self.base_addr = base_addr
+        # a symbols.SymbolMap; lines get tagged with what starts on them
+        self.symbols = symbols
+
+    def _tag(self, i, n):
+        addr = self.base_addr + i
+        starts = self.symbols.starting_in(addr, n)
+        names = [name if a == addr else f"{name}@{a - addr:x}" for a, name in starts]
+        if i == 0 and (not starts or starts[0][0] != addr) and self.symbols.lookup(addr):
+            # what we start off in the middle of
+            names.insert(0, self.symbols.format(addr))
+
+        return "  " + " ".join(names) if names else ""
+
+    def _line(self, i, bts, marks=None):
+        if marks is None:
+            # 23 = 8*2 + (8-1)
+            return "{:08x}  {:23}  {:23}  |{:16}|".format(
+                self.base_addr + i,
+                " ".join(f"{x:02x}" for x in bts[:8]),
+                " ".join(f"{x:02x}" for x in bts[8:]),
+                "".join(chr(x) if _printable(x) else "." for x in bts),
+            )
+
+        # same, but with marked bytes highlighted; pad by hand since the escapes have width
+        def hl(s, marked):
+            return f"\x1b[1;31m{s}\x1b[0m" if marked else s
+
+        def half(lo, hi):
+            cells = [hl(f"{x:02x}", m) for x, m in zip(bts[lo:hi], marks[lo:hi])]
+            n = len(cells)
+            return " ".join(cells) + " " * (23 - max(3 * n - 1, 0))
+
+        ascii = "".join(hl(chr(x) if _printable(x) else ".", m) for x, m in zip(bts, marks))
+        return f"{self.base_addr + i:08x}  {half(0, 8)}  {half(8, 16)}  |{ascii}{' ' * (BPL - len(bts))}|"
+
+    def _blocks(self, start=0, stop=None, lines_per_block=0x10000):
+        """
+        the dump of buf[start:stop] as ascii, newlines and all, a block of
+        lines at a time. addresses carry on from base_addr + start.
+        """
+        data = np.frombuffer(self.buf, dtype=np.uint8)[start:stop]
+        n_full = len(data) // BPL
+        cols = np.arange(LINE_WIDTH)
+
+        prev_row, prev_same = None, False
+        for first in range(0, n_full, lines_per_block):
+            rows = data[first * BPL : min(first + lines_per_block, n_full) * BPL].reshape(-1, BPL)
+
+            # same as the line before -> the first of a run becomes "*", the rest go
+            same = np.empty(len(rows), dtype=bool)
+            same[0] = prev_row is not None and (rows[0] == prev_row).all()
+            same[1:] = (rows[1:] == rows[:-1]).all(axis=1)
+            star = same & ~np.r_[prev_same, same[:-1]]
+            keep = ~same
+
+            sizes = np.where(keep, LINE_WIDTH, np.where(star, 2, 0))
+            offsets = np.cumsum(sizes) - sizes
+            out = np.empty(offsets[-1] + sizes[-1], dtype=np.uint8)
+
+            k = np.flatnonzero(keep)
+            addrs = self.base_addr + start + (first + k).astype(np.int64) * BPL
+            out[offsets[k, None] + cols] = _format_lines(rows[k], addrs)
+
+            k = offsets[star]
+            out[k] = ord("*")
+            out[k + 1] = ord("\n")
+
+            yield out.tobytes()
+            prev_row, prev_same = rows[-1], same[-1]
+
+        tail = data[n_full * BPL :]
+        if len(tail):
+            yield (self._line(start + n_full * BPL, tail.tobytes()) + "\n").encode()
+
+    def write(self, f, start=0, stop=None):
+        """stream the dump of buf[start:stop] to `f` (binary, or text with a .buffer)"""
+        if hasattr(f, "buffer"):
+            f.flush()
+            f = f.buffer
+
+        for block in self._blocks(start, stop):
+            f.write(block)
 
     def __iter__(self):
-        def _printable(x):
-            return 32 <= x < 127
+        if self.symbols is None:
+            for block in self._blocks():
+                yield from block.decode("ascii").splitlines()
+            return
 
-        BPL = 16  # 16 bytes per line
         last_line, last_bts = None, None
         for i in range(0, len(self.buf), BPL):
             bts = bytes(self.buf[i : i + BPL])
+            tag = self._tag(i, len(bts)) if self.symbols else ""
 
-            if bts == last_bts:
+            if bts == last_bts and not tag:
                 line = "*"
             else:
-                # 23 = 8*2 + (8-1)
-                line = "{:08x}  {:23}  {:23}  |{:16}|".format(
-                    self.base_addr + i,
-                    " ".join(f"{x:02x}" for x in bts[:8]),
-                    " ".join(f"{x:02x}" for x in bts[8:]),
-                    "".join(chr(x) if _printable(x) else "." for x in bts),
-                )
+                line = self._line(i, bts) + tag
 
             if line != last_line:
                 yield line
@@ -36,3 +145,36 @@ class hexdump:
 
     def __repr__(self):
         return str(self)
+
+
+class diffdump(hexdump):
+    """
+    hexdump of what changed from `old` to `buf`: each line with a change
+    comes out twice, old (-) then new (+), changed bytes highlighted (if
+    `color`). runs of unchanged lines collapse to a `*`.
+    """
+
+    def __init__(self, old, buf, base_addr=0x0, color=True):
+        super().__init__(buf, base_addr)
+        self.old = old
+        self.color = color
+
+    def __iter__(self):
+        skipped = False
+        for i in range(0, len(self.buf), BPL):
+            old = bytes(self.old[i : i + BPL])
+            new = bytes(self.buf[i : i + BPL])
+            if old == new:
+                skipped = True
+                continue
+
+            if skipped:
+                yield "*"
+                skipped = False
+
+            marks = [a != b for a, b in zip(old, new)] if self.color else None
+            yield "-" + self._line(i, old, marks)
+            yield "+" + self._line(i, new, marks)
+
+        if skipped:
+            yield "*"
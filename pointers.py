@@ -0,0 +1,218 @@
+"""
+pointer graph of a RAM image, for reverse engineering.
+
+every aligned u32 whose value lands in GC RAM counts as a pointer. the
+edges are kept as two pairs of parallel sorted arrays: by where the
+pointer lives (src -> dst), and by where it points (dst -> src, the
+reverse index). "who points at X" and "what does the struct at X point
+at" are then a couple of searchsorteds each.
+
+crawl() is a bounded BFS: every node is treated as a struct of `span`
+bytes, and every pointer inside it is an edge. that walks eg. from the
+player slots out to the fighters, their GObjs, JObj trees...
+"""
+
+from dataclasses import dataclass
+from logging import getLogger
+
+import click
+import numpy as np
+
+from memory import DOLMemory, GC_RAM_START, GC_RAM_END
+from melee import P_PLAYER_SLOTS, PLAYER_SLOT_SIZE, N_PLAYER_SLOTS, P_FTPARTSTABLE
+from snapshot import SnapshotBackend, GC_RAM_USED, read_ram
+from symbols import SymbolMap, load_symbols
+
+logger = getLogger(__name__)
+
+# (addr, span) places to start crawling from
+DEFAULT_ROOTS = [
+    (P_PLAYER_SLOTS, PLAYER_SLOT_SIZE * N_PLAYER_SLOTS),
+    (P_FTPARTSTABLE, 4),
+]
+DEFAULT_SPAN = 0x100
+
+
+class PointerIndex:
+    def __init__(self, ram):
+        words = np.frombuffer(ram, dtype=">u4", count=len(ram) // 4).astype(np.uint32)
+        is_ptr = (words >= GC_RAM_START) & (words < GC_RAM_END)
+
+        where = np.flatnonzero(is_ptr)
+        # by source: already sorted
+        self.src = (GC_RAM_START + 4 * where).astype(np.uint32)
+        self.dst = words[where]
+
+        # by destination (the reverse index)
+        order = np.argsort(self.dst, kind="stable")
+        self.rev_dst = self.dst[order]
+        self.rev_src = self.src[order]
+
+        self.ram_end = GC_RAM_START + len(ram)
+
+    def __len__(self):
+        return len(self.src)
+
+    def pointers_to(self, addr: int) -> np.ndarray:
+        """addresses of every pointer to exactly `addr`"""
+        lo = np.searchsorted(self.rev_dst, addr, side="left")
+        hi = np.searchsorted(self.rev_dst, addr, side="right")
+        return self.rev_src[lo:hi]
+
+    def pointers_into(self, addr: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+        """(src, dst) of every pointer into [addr, addr+size): eg. into the middle of a struct"""
+        lo = np.searchsorted(self.rev_dst, addr, side="left")
+        hi = np.searchsorted(self.rev_dst, addr + size, side="left")
+        return self.rev_src[lo:hi], self.rev_dst[lo:hi]
+
+    def pointers_in(self, addr: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+        """(src, dst) of every pointer stored in [addr, addr+size)"""
+        lo = np.searchsorted(self.src, addr, side="left")
+        hi = np.searchsorted(self.src, addr + size, side="left")
+        return self.src[lo:hi], self.dst[lo:hi]
+
+    def _edges(self, nodes: np.ndarray, spans: np.ndarray):
+        """every pointer inside each node, vectorized: (node index, src, dst)"""
+        lo = np.searchsorted(self.src, nodes, side="left")
+        hi = np.searchsorted(self.src, nodes + spans, side="left")
+        counts = hi - lo
+
+        owner = np.repeat(np.arange(len(nodes)), counts)
+        starts = np.cumsum(counts) - counts
+        edge = np.arange(counts.sum()) - np.repeat(starts, counts) + np.repeat(lo, counts)
+
+        return owner, self.src[edge], self.dst[edge]
+
+    def crawl(self, roots=DEFAULT_ROOTS, span: int = DEFAULT_SPAN, max_depth: int = 4, max_nodes: int = 100_000):
+        """bounded BFS out from `roots`, [(addr, span)...]. every node after those gets `span`"""
+        nodes = np.array([addr for addr, _ in roots], dtype=np.int64)
+        spans = np.array([size for _, size in roots], dtype=np.int64)
+
+        visited = np.zeros(self.ram_end - GC_RAM_START, dtype=bool)
+        visited[nodes - GC_RAM_START] = True
+
+        addr = [nodes]
+        parent = [np.full(len(nodes), -1, dtype=np.int64)]
+        field = [np.zeros(len(nodes), dtype=np.uint32)]
+        depth = [np.zeros(len(nodes), dtype=np.uint8)]
+
+        first = 0  # index of the frontier's first node in the output
+        total = len(nodes)
+        for d in range(1, max_depth + 1):
+            owner, src, dst = self._edges(nodes, spans)
+
+            # drop pointers past what we have, and anything seen already
+            dst = dst.astype(np.int64)
+            keep = dst < self.ram_end
+            owner, src, dst = owner[keep], src[keep], dst[keep]
+            keep = ~visited[dst - GC_RAM_START]
+            owner, src, dst = owner[keep], src[keep], dst[keep]
+
+            # a target can show up more than once per level; first one wins
+            dst, first_seen = np.unique(dst, return_index=True)
+            owner, src = owner[first_seen], src[first_seen]
+
+            if total + len(dst) > max_nodes:
+                logger.warning(f"hit max_nodes={max_nodes} at depth {d}")
+                dst, owner, src = dst[: max_nodes - total], owner[: max_nodes - total], src[: max_nodes - total]
+            if not len(dst):
+                break
+
+            visited[dst - GC_RAM_START] = True
+            addr.append(dst)
+            parent.append(first + owner)
+            field.append((src - nodes[owner]).astype(np.uint32))
+            depth.append(np.full(len(dst), d, dtype=np.uint8))
+
+            first = total
+            total += len(dst)
+            nodes, spans = dst, np.full(len(dst), span, dtype=np.int64)
+
+        return Crawl(
+            addr=np.concatenate(addr),
+            parent=np.concatenate(parent),
+            field=np.concatenate(field),
+            depth=np.concatenate(depth),
+        )
+
+
+@dataclass
+class Crawl:
+    """
+    one row per node reached. `parent` indexes back into these arrays (-1
+    for roots), `field` is where in the parent the pointer to it was.
+    """
+
+    addr: np.ndarray
+    parent: np.ndarray
+    field: np.ndarray
+    depth: np.ndarray
+
+    def __len__(self):
+        return len(self.addr)
+
+    def find(self, addr: int) -> int:
+        hits = np.flatnonzero(self.addr == addr)
+        return int(hits[0]) if len(hits) else -1
+
+    def path(self, i: int) -> list[tuple[int, int]]:
+        """[(node addr, field offset followed)...] from a root down to node i"""
+        path = []
+        while i >= 0:
+            path.append((int(self.addr[i]), int(self.field[i])))
+            i = int(self.parent[i])
+        path.reverse()
+
+        # each node's field is where its parent held the pointer; shift them onto the parents
+        return [(addr, field) for (addr, _), (_, field) in zip(path, path[1:] + [(0, 0)])]
+
+    def format_path(self, i: int, symbols: SymbolMap = None) -> str:
+        *steps, (last, _) = self.path(i)
+        if symbols is None:
+            return "".join(f"{addr:08x}+{field:#x} -> " for addr, field in steps) + f"{last:08x}"
+
+        return "".join(f"{symbols.format(addr + field)} -> " for addr, field in steps) + symbols.format(last)
+
+
+def _int(s) -> int:
+    return s if isinstance(s, int) else int(s, 0)
+
+
+def _parse_roots(roots):
+    out = []
+    for root in roots:
+        addr, _, size = root.partition(":")
+        out.append((int(addr, 0), int(size, 0) if size else DEFAULT_SPAN))
+    return out
+
+
+@click.command()
+@click.option("--snapshot", type=click.Path(exists=True, dir_okay=False), help="RAM dump instead of live")
+@click.option("--root", "roots", multiple=True, help="ADDR[:SPAN] to crawl from (default: player slots, ftPartsTable)")
+@click.option("--span", type=_int, default=DEFAULT_SPAN, help="bytes of each node to look for pointers in")
+@click.option("--depth", type=int, default=3)
+@click.option("--to", "to", type=_int, help="instead, list what points at this address")
+@click.option("--symbols", type=click.Path(exists=True, dir_okay=False), help=".map or symbols.txt to name addresses with")
+def cli(snapshot, roots, span, depth, to, symbols):
+    if snapshot:
+        ram = SnapshotBackend(snapshot).read(0, GC_RAM_USED)
+    else:
+        ram = read_ram(DOLMemory())
+
+    syms = load_symbols(symbols)
+    index = PointerIndex(ram)
+    print(f"{len(index)} pointers")
+
+    if to is not None:
+        srcs = index.pointers_to(to)
+        for src, name in zip(srcs.tolist(), syms.annotate(srcs)):
+            print(f"{src:08x}  {name}")
+        return
+
+    crawl = index.crawl(_parse_roots(roots) if roots else DEFAULT_ROOTS, span=span, max_depth=depth)
+    for i in range(len(crawl)):
+        print(f"{'  ' * crawl.depth[i]}{crawl.format_path(i, syms)}")
+
+
+if __name__ == "__main__":
+    cli()
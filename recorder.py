@@ -0,0 +1,338 @@
+"""
+flight recorder for live game state.
+
+every sampled frame becomes one fixed-size record (a numpy structured
+dtype, so each field is a column): frame number, timestamp, the raw
+StaticPlayer block, and per fighter the SRT arrays and world matrices.
+
+records go into an in-memory ring of the last N seconds, which can be
+dumped whenever, and optionally get streamed to an append-only file by a
+background thread, so sampling never waits on the disk. a recording file
+is a small header followed by packed records; Recording mmaps it and
+hands out zero-copy views of any frame range.
+
+records are not small. the StaticPlayer block alone is 0xE90 * 4 bytes,
+and every fighter slot costs max_bones * (10 + 12 with mtx) floats
+whether anyone's in it or not: the defaults (8 fighters, 96 bones, mtx)
+come to ~82 KB a frame, ~148 MB for a 30 s ring and ~17.7 GB an hour
+streamed. the record cli sizes the layout off who's actually playing
+(2 fighters at ~60 bones is ~25 KB a frame).
+"""
+
+import os
+import ast
+import queue
+import struct
+import threading
+from logging import getLogger
+
+import click
+import numpy as np
+
+from memory import DOLMemory
+from melee import Melee, PLAYER_SLOT_SIZE, N_PLAYER_SLOTS
+from sampler import FrameSampler, Sample
+
+logger = getLogger(__name__)
+
+MAGIC = b"CINEREC1"
+HEADER = struct.Struct("<8sI")  # magic, length of the header text that follows
+
+# (slot, is_nana) for every fighter a record has room for
+DEFAULT_FIGHTERS = [(slot, nana) for slot in range(N_PLAYER_SLOTS) for nana in (False, True)]
+DEFAULT_MAX_BONES = 96
+FPS = 60
+
+
+def record_dtype(
+    n_fighters: int = len(DEFAULT_FIGHTERS),
+    max_bones: int = DEFAULT_MAX_BONES,
+    mtx: bool = True,
+    static_players: bool = True,
+) -> np.dtype:
+    F, B = n_fighters, max_bones
+    fields = [
+        ("frame", "<u4"),
+        ("torn", "u1"),
+        ("timestamp", "<f8"),
+        ("present", "u1", (F,)),
+        ("kind", "u1", (F,)),
+        ("n_bones", "<u2", (F,)),
+        ("rotate", "<f4", (F, B, 4)),
+        ("scale", "<f4", (F, B, 3)),
+        ("translate", "<f4", (F, B, 3)),
+    ]
+    if mtx:
+        fields.append(("mtx", "<f4", (F, B, 3, 4)))
+    if static_players:
+        fields.append(("static_players", "u1", (N_PLAYER_SLOTS * PLAYER_SLOT_SIZE,)))
+
+    return np.dtype(fields)
+
+
+def _header(dtype: np.dtype, fighters) -> bytes:
+    text = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fighters": list(fighters)})
+    body = text.encode()
+    # pad so records start 16-aligned
+    body += b" " * (-(HEADER.size + len(body)) % 16)
+
+    return HEADER.pack(MAGIC, len(body)) + body
+
+
+def _read_header(f) -> tuple[np.dtype, list, int]:
+    magic, size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{f.name}: not a recording")
+
+    meta = ast.literal_eval(f.read(size).decode())
+    dtype = np.lib.format.descr_to_dtype(meta["descr"])
+
+    return dtype, [tuple(x) for x in meta["fighters"]], HEADER.size + size
+
+
+def fill_record(rec: np.ndarray, sample: Sample, fighters):
+    """pack a Sample into one (0-d) record of a record_dtype()"""
+    snapshot = sample.snapshot
+    names = rec.dtype.names
+    max_bones = rec["rotate"].shape[1]
+
+    bone_fields = [name for name in ("rotate", "scale", "translate", "mtx") if name in names]
+
+    rec["frame"] = sample.frame
+    rec["torn"] = snapshot.torn
+    rec["timestamp"] = sample.timestamp
+    rec["present"] = 0
+
+    for k, key in enumerate(fighters):
+        player = snapshot.players.get(key)
+        n = 0
+        if player is not None:
+            n = len(player.skeleton)
+            if n > max_bones:
+                logger.warning(f"{key}: {n} bones, only recording {max_bones}")
+                n = max_bones
+
+        # ring slots get reused; don't leave a previous frame's bones behind
+        for name in bone_fields:
+            rec[name][k, n:] = 0
+        if player is None:
+            rec["kind"][k] = 0
+            rec["n_bones"][k] = 0
+            continue
+
+        skeleton = player.skeleton
+        rec["present"][k] = 1
+        rec["kind"][k] = player.meta.kind
+        rec["n_bones"][k] = n
+        rec["rotate"][k, :n] = skeleton.rotate[:n]
+        rec["scale"][k, :n] = skeleton.scale[:n]
+        rec["translate"][k, :n] = skeleton.translate[:n]
+        if "mtx" in names:
+            rec["mtx"][k, :n] = skeleton.mtx[:n]
+
+    if "static_players" in names:
+        rec["static_players"] = snapshot.static_players.view(np.uint8)
+
+
+class RecordWriter(threading.Thread):
+    """appends records to a recording file off the sampling thread"""
+
+    def __init__(self, path, dtype: np.dtype, fighters, max_pending: int = 10 * FPS):
+        super().__init__(name=f"RecordWriter({path})", daemon=True)
+        self.path = path
+        self.dtype = dtype
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.written = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                old_dtype, old_fighters, header_size = _read_header(f)
+            if old_dtype != dtype or old_fighters != list(fighters):
+                raise ValueError(f"{path}: existing recording has a different layout")
+
+            # chop off a partial record from a crash, so we stay aligned
+            records = (os.path.getsize(path) - header_size) // dtype.itemsize
+            os.truncate(path, header_size + records * dtype.itemsize)
+            self.f = open(path, "ab")
+        else:
+            self.f = open(path, "wb")
+            self.f.write(_header(dtype, fighters))
+
+    def put(self, rec: np.ndarray):
+        """never blocks; if the disk can't keep up, records get dropped (and counted)"""
+        try:
+            self.queue.put_nowait(rec.tobytes())
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            buf = self.queue.get()
+            if buf is None:
+                break
+
+            self.f.write(buf)
+            self.written += 1
+
+        self.f.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+
+
+class FlightRecorder:
+    """
+    keeps the last `seconds` of samples in a preallocated ring, and
+    streams everything to `path` too if one's given.
+    """
+
+    def __init__(
+        self,
+        seconds: float = 30,
+        path=None,
+        fighters=DEFAULT_FIGHTERS,
+        max_bones: int = DEFAULT_MAX_BONES,
+        mtx: bool = True,
+        static_players: bool = True,
+    ):
+        self.fighters = list(fighters)
+        self.dtype = record_dtype(len(self.fighters), max_bones, mtx, static_players)
+
+        self.ring = np.zeros(max(1, int(seconds * FPS)), dtype=self.dtype)
+        self.count = 0  # records ever written to the ring
+
+        self.writer = None
+        if path:
+            self.writer = RecordWriter(path, self.dtype, self.fighters)
+            self.writer.start()
+
+    def __len__(self):
+        return min(self.count, len(self.ring))
+
+    def record(self, sample: Sample):
+        rec = self.ring[self.count % len(self.ring)]
+        fill_record(rec, sample, self.fighters)
+        self.count += 1
+
+        if self.writer:
+            self.writer.put(rec)
+
+    def last(self, n: int = None) -> np.ndarray:
+        """the newest `n` (default: all held) records, oldest first. a copy"""
+        n = len(self) if n is None else min(n, len(self))
+        end = self.count % len(self.ring)
+        idx = (np.arange(end - n, end)) % len(self.ring)
+
+        return self.ring[idx]
+
+    def dump(self, path):
+        """write the ring (oldest first) out as a recording file"""
+        with open(path, "wb") as f:
+            f.write(_header(self.dtype, self.fighters))
+            f.write(self.last().tobytes())
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            if self.writer.dropped:
+                logger.warning(f"writer dropped {self.writer.dropped} records")
+
+
+class Recording:
+    """a recording file, mmapped. .records is the whole thing; slices are views"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.dtype, self.fighters, header_size = _read_header(f)
+
+        # a writer may be mid-record; only map whole ones
+        n = (os.path.getsize(path) - header_size) // self.dtype.itemsize
+        self.records = np.memmap(path, dtype=self.dtype, mode="r", offset=header_size, shape=(n,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def frames(self, first: int, last: int) -> np.ndarray:
+        """records with first <= frame <= last (frames are recorded in order)"""
+        frame = self.records["frame"]
+        lo = np.searchsorted(frame, first, side="left")
+        hi = np.searchsorted(frame, last, side="right")
+
+        return self.records[lo:hi]
+
+    def fighter(self, slot: int, nana: bool = False) -> int:
+        """which index of the per-fighter columns is (slot, nana)"""
+        return self.fighters.index((slot, nana))
+
+    def layout(self) -> dict:
+        """FlightRecorder kwargs that write records just like these"""
+        names = self.dtype.names
+        return {
+            "fighters": self.fighters,
+            "max_bones": self.dtype["rotate"].shape[1],
+            "mtx": "mtx" in names,
+            "static_players": "static_players" in names,
+        }
+
+
+def layout_for(sample: Sample, spare_bones: int = 8) -> dict:
+    """FlightRecorder kwargs sized for who's in `sample` (plus a few spare bones)"""
+    players = sample.snapshot.players
+    if not players:
+        return {}
+
+    return {
+        "fighters": sorted(players),
+        "max_bones": max(len(p.skeleton) for p in players.values()) + spare_bones,
+    }
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.argument("out", type=click.Path(dir_okay=False))
+@click.option("--seconds", type=float, default=30, help="how much to keep in memory for --dump-on-exit")
+@click.option("--dump-on-exit", type=click.Path(dir_okay=False), help="also dump the ring here when stopped")
+def record(out, seconds, dump_on_exit):
+    """record live until ^C"""
+    sampler = FrameSampler(Melee(DOLMemory()), reuse=True)
+    first = sampler.next_sample()
+
+    # appending keeps the file's layout; otherwise only make room for who's playing
+    exists = os.path.exists(out) and os.path.getsize(out) > 0
+    layout = Recording(out).layout() if exists else layout_for(first)
+    recorder = FlightRecorder(seconds=seconds, path=out, **layout)
+    logger.info(f"{recorder.dtype.itemsize} bytes a frame, {len(recorder.ring) * recorder.dtype.itemsize >> 20} MiB ring")
+
+    try:
+        recorder.record(first)
+        for sample in sampler:
+            recorder.record(sample)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+        if dump_on_exit:
+            recorder.dump(dump_on_exit)
+
+    print(f"{recorder.count} frames, {sampler.stats.missed} missed")
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def info(path):
+    rec = Recording(path)
+    frame = rec.records["frame"]
+    print(f"{len(rec)} records of {rec.dtype.itemsize} bytes")
+    if len(rec):
+        print(f"frames {frame[0]}..{frame[-1]}, {int((rec.records['torn'] != 0).sum())} torn")
+
+
+if __name__ == "__main__":
+    cli()
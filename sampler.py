@@ -0,0 +1,177 @@
+"""
+frame-synchronous sampling: one Melee.snapshot() per emulated frame.
+
+polling on our own clock (eg. pygame's clock.tick(60)) against a 60Hz game
+drops some frames and doubles others. FrameSampler instead watches
+P_FRAME_COUNTER: it sleeps until shortly before the next frame is due, then
+spins on the counter, and snapshots as soon as it moves.
+"""
+
+import time
+import struct
+from dataclasses import dataclass
+from logging import getLogger
+
+import click
+
+from memory import DOLMemory
+from melee import Melee, GameSnapshot, P_FRAME_COUNTER
+
+logger = getLogger(__name__)
+
+FRAME_PERIOD = 1 / 59.94  # NTSC
+
+
+@dataclass
+class Sample:
+    frame: int  # P_FRAME_COUNTER the snapshot was read under (snapshot.frame)
+    timestamp: float  # perf_counter() right after the snapshot was read
+    missed: int  # frames that went by since the previous sample without one
+    latency: float  # worst case seconds from the frame changing to the snapshot being done
+    snapshot: GameSnapshot
+
+
+@dataclass
+class SamplerStats:
+    samples: int = 0
+    missed: int = 0
+    polls: int = 0
+    late: int = 0  # the frame had already changed by the time we started spinning
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    @property
+    def latency_mean(self) -> float:
+        return self.latency_total / self.samples if self.samples else 0.0
+
+    @property
+    def polls_per_sample(self) -> float:
+        return self.polls / self.samples if self.samples else 0.0
+
+
+class FrameSampler:
+    """
+    iterate for Samples. the spin window (how early we wake up before the
+    frame's due) adapts: it grows when we wake up late and shrinks when we
+    spin for a long time. the frame period is tracked from what we observe.
+    if the counter stops (pause, loading), we back off to sleep-polling.
+
+    with reuse=True the snapshots share storage frame to frame (see
+    Melee.snapshot), so consumers must be done with each one before the next.
+    """
+
+    MIN_SPIN = 0.00025
+    IDLE_SLEEP = 0.001
+
+    def __init__(self, melee: Melee, reuse: bool = False, spin_window: float = 0.002):
+        self.melee = melee
+        self.mem: DOLMemory = melee.mem
+        self.reuse = reuse
+
+        self.period = FRAME_PERIOD
+        self.spin_window = spin_window
+        self.stats = SamplerStats()
+
+        self.last_frame = None
+        self.last_change = None
+        self._last_snapshot = None
+
+    def poll_frame(self) -> int:
+        self.stats.polls += 1
+        return struct.unpack(">I", self.mem.read_direct(P_FRAME_COUNTER, 4))[0]
+
+    def wait_next_frame(self) -> tuple[int, float]:
+        """block until the frame counter moves. returns (frame, detection slop in seconds)"""
+        if self.last_frame is None:
+            self.last_frame = self.poll_frame()
+            self.last_change = time.perf_counter()
+
+        wake = self.last_change + self.period - self.spin_window
+        now = time.perf_counter()
+        if now < wake:
+            time.sleep(wake - now)
+
+        spins = 0
+        last_poll = time.perf_counter()
+        while True:
+            frame = self.poll_frame()
+            now = time.perf_counter()
+            if frame != self.last_frame:
+                break
+
+            spins += 1
+            last_poll = now
+            if now - self.last_change > 4 * self.period:
+                # paused or loading; no point burning a core
+                time.sleep(self.IDLE_SLEEP)
+            else:
+                time.sleep(0)
+
+        if spins == 0:
+            # it was already there when we woke up: wake up earlier
+            self.stats.late += 1
+            self.spin_window = min(self.spin_window * 1.5, self.period / 2)
+        elif now - wake > 2 * self.spin_window:
+            self.spin_window = max(self.spin_window * 0.9, self.MIN_SPIN)
+
+        elapsed = now - self.last_change
+        steps = frame - self.last_frame
+        if steps == 1 and elapsed < 2 * self.period:
+            self.period += 0.05 * (elapsed - self.period)
+
+        self.last_change = now
+        return frame, now - last_poll
+
+    def next_sample(self) -> Sample:
+        prev = self.last_frame
+        frame, slop = self.wait_next_frame()
+
+        snapshot = self.melee.snapshot(out=self._last_snapshot if self.reuse else None)
+        self._last_snapshot = snapshot
+        done = time.perf_counter()
+
+        # if the seqlock retried, the snapshot can be of a later frame than
+        # the one we polled; go by what we actually got
+        frame = snapshot.frame
+
+        missed = max(frame - prev - 1, 0) if prev is not None else 0
+        latency = done - self.last_change + slop
+
+        self.last_frame = frame
+
+        stats = self.stats
+        stats.samples += 1
+        stats.missed += missed
+        stats.latency_total += latency
+        stats.latency_max = max(stats.latency_max, latency)
+
+        if missed:
+            logger.debug(f"missed {missed} frame(s) before {frame}")
+
+        return Sample(frame=frame, timestamp=done, missed=missed, latency=latency, snapshot=snapshot)
+
+    def __iter__(self):
+        while True:
+            yield self.next_sample()
+
+
+@click.command()
+@click.option("--frames", type=int, default=600, help="how many frames to sample")
+def cli(frames):
+    """sample live and report how well we kept up"""
+    sampler = FrameSampler(Melee(DOLMemory()), reuse=True)
+
+    for i, sample in zip(range(frames), sampler):
+        if i % 60 == 59:
+            s = sampler.stats
+            print(
+                f"frame {sample.frame}: {s.samples} samples, {s.missed} missed, "
+                f"latency {s.latency_mean * 1e3:.2f}ms avg / {s.latency_max * 1e3:.2f}ms max, "
+                f"{s.polls_per_sample:.1f} polls/sample, spin window {sampler.spin_window * 1e3:.2f}ms, "
+                f"{sampler.melee.seqlock_stats.retry_rate:.1%} retried / "
+                f"{sampler.melee.seqlock_stats.torn_rate:.1%} torn"
+            )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,189 @@
+"""
+value scanner over whole RAM images, cheat engine style.
+
+RAM is viewed as an array of aligned big endian values (u8/u16/u32/f32),
+so a first scan is one vectorized compare over all of it. candidates are
+kept as a compact array of element indices plus the values they held at
+the last step; successive frames narrow them down (changed, unchanged,
+increased, decreased, or another value test).
+
+    scan = Scan(read_ram(mem), "f32")
+    scan.exact(1.0)              # eg. a scale
+    scan.changed(read_ram(mem))  # after it moves
+    scan.addresses
+"""
+
+from logging import getLogger
+
+import click
+import numpy as np
+
+from memory import DOLMemory, GC_RAM_START
+from snapshot import SnapshotBackend, GC_RAM_USED, read_ram
+
+logger = getLogger(__name__)
+
+SCAN_TYPES = {
+    "u8": ">u1",
+    "u16": ">u2",
+    "u32": ">u4",
+    "f32": ">f4",
+}
+
+
+class Scan:
+    """
+    `idx` is None while every aligned value is still a candidate, then a
+    uint32 array of element indices (address = GC_RAM_START + idx * size).
+    `values` are the candidates' (native endian) values as of the last step.
+
+    every narrowing method takes an optional new `ram`; with one, that
+    becomes the current frame and comparisons are against the previous one.
+    they return how many candidates are left.
+    """
+
+    def __init__(self, ram, type: str = "u32"):
+        self.type = type
+        self.dtype = np.dtype(SCAN_TYPES[type])
+        self.idx = None
+        self.values = self._view(ram).astype(self.dtype.newbyteorder("="))
+
+    def __len__(self):
+        return len(self.values)
+
+    def _view(self, ram) -> np.ndarray:
+        return np.frombuffer(ram, dtype=self.dtype, count=len(ram) // self.dtype.itemsize)
+
+    def _current(self, ram) -> np.ndarray:
+        if ram is None:
+            return self.values
+
+        view = self._view(ram)
+        if self.idx is not None:
+            view = view[self.idx]
+
+        return view.astype(self.values.dtype)
+
+    def _narrow(self, mask: np.ndarray, current: np.ndarray) -> int:
+        keep = np.flatnonzero(mask)
+        self.idx = keep.astype(np.uint32) if self.idx is None else self.idx[keep]
+        self.values = current[keep]
+
+        return len(self)
+
+    def exact(self, value, ram=None, tol: float = 0.0) -> int:
+        cur = self._current(ram)
+        if not tol:
+            mask = cur == value
+        else:
+            # widen first: unsigned cur - value wraps around instead of going negative
+            wide = np.float64 if cur.dtype.kind == "f" else np.int64
+            mask = np.abs(cur.astype(wide) - value) <= tol
+        return self._narrow(mask, cur)
+
+    def range(self, lo, hi, ram=None) -> int:
+        """lo <= value <= hi"""
+        cur = self._current(ram)
+        return self._narrow((cur >= lo) & (cur <= hi), cur)
+
+    def where(self, pred, ram=None) -> int:
+        """keep values where pred(values) (vectorized, returns a bool array) holds"""
+        cur = self._current(ram)
+        return self._narrow(np.asarray(pred(cur), dtype=bool), cur)
+
+    def changed(self, ram) -> int:
+        cur = self._current(ram)
+        return self._narrow(cur != self.values, cur)
+
+    def unchanged(self, ram) -> int:
+        cur = self._current(ram)
+        return self._narrow(cur == self.values, cur)
+
+    def increased(self, ram) -> int:
+        cur = self._current(ram)
+        return self._narrow(cur > self.values, cur)
+
+    def decreased(self, ram) -> int:
+        cur = self._current(ram)
+        return self._narrow(cur < self.values, cur)
+
+    @property
+    def indices(self) -> np.ndarray:
+        return self.idx if self.idx is not None else np.arange(len(self.values), dtype=np.uint32)
+
+    @property
+    def addresses(self) -> np.ndarray:
+        return GC_RAM_START + self.indices.astype(np.int64) * self.dtype.itemsize
+
+    def results(self, limit: int = None) -> list[tuple[int, object]]:
+        """(addr, value) pairs, the first `limit` of them"""
+        n = len(self) if limit is None else min(limit, len(self))
+        idx = self.indices[:n].astype(np.int64)
+
+        return list(zip((GC_RAM_START + idx * self.dtype.itemsize).tolist(), self.values[:n].tolist()))
+
+
+NARROWING = {
+    "changed": Scan.changed,
+    "unchanged": Scan.unchanged,
+    "inc": Scan.increased,
+    "dec": Scan.decreased,
+}
+
+
+@click.command()
+@click.option("--type", "type_", type=click.Choice(list(SCAN_TYPES)), default="u32")
+@click.argument("snapshots", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def cli(type_, snapshots):
+    """
+    interactive narrowing. every command but `list` takes a fresh frame of RAM:
+    live from dolphin, or the next of SNAPSHOTS if any are given.
+
+    \b
+    commands: = V | range LO HI | changed | unchanged | inc | dec | list [N] | quit
+    """
+    if snapshots:
+        frames = (SnapshotBackend(path).read(0, GC_RAM_USED) for path in snapshots)
+    else:
+        mem = DOLMemory()
+        frames = iter(lambda: read_ram(mem), None)
+
+    parse = float if type_ == "f32" else lambda s: int(s, 0)
+    scan = Scan(next(frames), type_)
+    print(f"{len(scan)} candidates")
+
+    while True:
+        try:
+            cmd, *args = input("scan> ").split() or [""]
+        except EOFError:
+            break
+
+        if cmd in ("quit", "q"):
+            break
+        if cmd == "list":
+            for addr, value in scan.results(int(args[0]) if args else 20):
+                print(f"{addr:08x}  {value}")
+            continue
+
+        if cmd not in ("=", "range", *NARROWING):
+            print(f"?? {cmd}")
+            continue
+
+        try:
+            ram = next(frames)
+        except StopIteration:
+            print("out of snapshots")
+            break
+
+        if cmd == "=":
+            scan.exact(parse(args[0]), ram)
+        elif cmd == "range":
+            scan.range(parse(args[0]), parse(args[1]), ram)
+        else:
+            NARROWING[cmd](scan, ram)
+
+        print(f"{len(scan)} candidates")
+
+
+if __name__ == "__main__":
+    cli()
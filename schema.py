@@ -0,0 +1,80 @@
+"""
+declarative layouts for game structs.
+
+a Schema is declared once as (name, offset, type[, shape]) fields and
+compiles to a big endian numpy structured dtype with explicit offsets,
+so one read of `sizeof` bytes (or of a whole table of them) decodes with
+a single np.frombuffer, no per-field unpacking.
+
+    HSD_Foo = Schema("HSD_Foo", [
+        ("p_next", 0x08, "u4"),
+        ("pos",    0x10, "f4", (3,)),
+    ], size=0x20)
+
+    recs = HSD_Foo.read(mem, p_foo, count=4)
+    recs["pos"]  # (4, 3) view into the read buffer
+"""
+
+import numpy as np
+
+
+class Schema:
+    def __init__(self, name: str, fields: list[tuple], size: int = None):
+        """
+        fields are (name, offset, fmt) or (name, offset, fmt, shape), where
+        fmt is a numpy type code without byte order ("u4", "f4", "i2"...).
+        everything is big endian. `size` defaults to the end of the last field.
+        """
+        self.name = name
+        self.fields = fields
+
+        names, formats, offsets = [], [], []
+        end = 0
+        for field in fields:
+            fname, offset, fmt, *shape = field
+            ftype = np.dtype(">" + fmt) if not shape else np.dtype((">" + fmt, shape[0]))
+
+            names.append(fname)
+            formats.append(ftype)
+            offsets.append(offset)
+            end = max(end, offset + ftype.itemsize)
+
+        if size is not None and size < end:
+            raise ValueError(f"{name}: fields run to {end:#x}, past size {size:#x}")
+
+        self.dtype = np.dtype(
+            {
+                "names": names,
+                "formats": formats,
+                "offsets": offsets,
+                "itemsize": size if size is not None else end,
+            }
+        )
+
+    def __repr__(self):
+        return f"<Schema {self.name} size={self.size:#x}>"
+
+    @property
+    def size(self) -> int:
+        return self.dtype.itemsize
+
+    def resized(self, size: int) -> "Schema":
+        """the fields that fit in `size` bytes, `size` bytes apart (eg. an older/newer version of a record)"""
+        fields = []
+        for field in self.fields:
+            ftype = self.dtype.fields[field[0]][0]
+            if field[1] + ftype.itemsize <= size:
+                fields.append(field)
+
+        return Schema(self.name, fields, size=size)
+
+    def offset(self, field: str) -> int:
+        return self.dtype.fields[field][1]
+
+    def from_buffer(self, buf, count: int = 1) -> np.ndarray:
+        """view `count` packed records at the start of `buf` (no copy)"""
+        return np.frombuffer(buf, dtype=self.dtype, count=count)
+
+    def read(self, mem, addr: int, count: int = 1) -> np.ndarray:
+        """read `count` packed records starting at `addr` in one go"""
+        return self.from_buffer(mem.read(addr, self.size * count), count=count)
@@ -0,0 +1,386 @@
+"""
+fast .slp replay reading.
+
+a replay is a UBJSON object whose "raw" element is the event stream: a
+flat run of [command byte][payload] packets. SlpFile mmaps the file and
+walks that stream with an integer cursor over a memoryview, decoding
+with struct.unpack_from at offsets. payloads nobody decodes are stepped
+over without being read, let alone copied.
+
+packet sizes come from the replay's own DESCRIPTIONS packet (always the
+first one), so commands we've never heard of are skipped by length. to
+pull out just some commands, hand decode() a handler per command:
+
+    pre = Fields(action_state=(0xA, "H"), x=(0xC, "f"), y=(0x10, "f"))
+    for cmd, p in slp.decode({CommandId.PRE_FRAME: pre}):
+        ...
+"""
+
+import mmap
+import struct
+from enum import IntEnum
+from logging import getLogger
+
+import numpy as np
+
+from melee import FighterKind
+
+logger = getLogger(__name__)
+
+
+class CommandId(IntEnum):
+    SPLIT_MESSAGE = 0x10
+    DESCRIPTIONS = 0x35
+    GAME_INFO = 0x36
+    GECKO_LIST = 0x3D
+    INITIAL_RNG = 0x3A
+    PRE_FRAME = 0x37
+    POST_FRAME = 0x38
+    ITEM = 0x3B
+    FRAME_BOOKEND = 0x3C
+    GAME_END = 0x39
+    BONES = 0x60
+
+
+# ubjson for {"raw": [$U #l <u32 length>
+RAW_HEADER = b"{U\x03raw[$U#l"
+RAW_START = len(RAW_HEADER) + 4
+
+SPLIT_BLOCK = 0x200
+SPLIT_TRAILER = struct.Struct(">HB?")  # actual_size, chunk_internal_cmd, is_last
+
+_COMMANDS = {int(c): c for c in CommandId}
+
+
+class Fields:
+    """
+    a handler reading just the named fields of a payload,
+    {name: (offset into the payload, struct format char)}, into a dict.
+    it's one precompiled big-endian Struct that pads over everything else.
+    """
+
+    def __init__(self, **fields: tuple[int, str]):
+        fmt, pos = ">", 0
+        for name, (offset, code) in sorted(fields.items(), key=lambda f: f[1][0]):
+            if offset < pos:
+                raise ValueError(f"{name} at {offset:#x} overlaps the field before it")
+            if offset > pos:
+                fmt += f"{offset - pos}x"
+            fmt += code
+            pos = offset + struct.calcsize(">" + code)
+
+        self.names = tuple(sorted(fields, key=lambda name: fields[name][0]))
+        self.struct = struct.Struct(fmt)
+        self.size = self.struct.size
+
+    def __repr__(self):
+        return f"<Fields {', '.join(self.names)}>"
+
+    def __call__(self, buf, off, size):
+        return dict(zip(self.names, self.struct.unpack_from(buf, off)))
+
+
+def _descriptions(buf, off, size):
+    # entries follow the size byte
+    sizes = struct.iter_unpack(">BH", buf[off + 1 : off + size])
+    return {"command_sizes": [(_COMMANDS.get(cmd, cmd), cmd_size) for cmd, cmd_size in sizes]}
+
+
+def _split_message(buf, off, size):
+    actual_size, cmd, is_last = SPLIT_TRAILER.unpack_from(buf, off + SPLIT_BLOCK)
+    return {
+        "message_block": buf[off : off + actual_size],
+        "actual_size": actual_size,
+        "chunk_internal_cmd": _COMMANDS.get(cmd, cmd),
+        "is_last": is_last,
+    }
+
+
+_BONES_HEADER = struct.Struct(">iBBB")
+
+
+def _bones(buf, off, size):
+    # the transforms themselves are slpframes.bone_data()'s business
+    frame_idx, player_idx, chara_id, n_bones = _BONES_HEADER.unpack_from(buf, off)
+    return {"frame_idx": frame_idx, "player_idx": player_idx, "chara_id": FighterKind(chara_id), "n_bones": n_bones}
+
+
+_INITIAL_RNG = struct.Struct(">iII")
+
+
+def _initial_rng(buf, off, size):
+    frame, seed, scene_frame_counter = _INITIAL_RNG.unpack_from(buf, off)
+    return {"frame": frame, "seed": seed, "scene_frame_counter": scene_frame_counter}
+
+
+_FRAME_BOOKEND = struct.Struct(">ii")
+
+
+def _frame_bookend(buf, off, size):
+    frame, latest_finalized_frame = _FRAME_BOOKEND.unpack_from(buf, off)
+    return {"frame": frame, "latest_finalized_frame": latest_finalized_frame}
+
+
+# the packets we decode; everything else is None
+DECODERS = {
+    CommandId.DESCRIPTIONS: _descriptions,
+    CommandId.SPLIT_MESSAGE: _split_message,
+    CommandId.BONES: _bones,
+    CommandId.INITIAL_RNG: _initial_rng,
+    CommandId.FRAME_BOOKEND: _frame_bookend,
+}
+
+
+class SplitMessage:
+    """
+    puts SPLIT_MESSAGE chunks back together. feed() it each one's payload
+    offset; the last chunk gets back (wrapped command, the whole message).
+    chunks are copied into one buffer, preallocated to the size
+    DESCRIPTIONS gives the wrapped command and reused message to message.
+    """
+
+    def __init__(self, sizes: dict[int, int] = None):
+        self.sizes = sizes or {}
+        self.buf = bytearray()
+        self.length = 0
+        self.wrapped = None
+
+    def feed(self, buf, off):
+        actual_size, cmd, is_last = SPLIT_TRAILER.unpack_from(buf, off + SPLIT_BLOCK)
+        if self.wrapped is None:
+            self.wrapped = cmd
+            if len(self.buf) < self.sizes.get(cmd, 0):
+                self.buf = bytearray(self.sizes[cmd])
+        assert self.wrapped == cmd, f"split {self.wrapped:#x} interrupted by a {cmd:#x}"
+
+        end = self.length + actual_size
+        if end > len(self.buf):
+            # bigger than described (or not described at all)
+            self.buf.extend(bytes(end - len(self.buf)))
+        self.buf[self.length : end] = buf[off : off + actual_size]
+        self.length = end
+        if not is_last:
+            return None
+
+        data = memoryview(self.buf)[: self.length].tobytes()
+        wrapped = _COMMANDS.get(self.wrapped, self.wrapped)
+        self.length = 0
+        self.wrapped = None
+        return wrapped, data
+
+
+class SlpFile:
+    """
+    an mmapped replay. offsets handed out are into `view` (the whole file).
+    if the raw length is 0 (dolphin hasn't finished writing it), the event
+    stream is taken to run to the end of the file; a packet cut off at the
+    end is dropped.
+
+    `sizes` is {command byte: payload size} as DESCRIPTIONS has it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+
+        if self.view[: len(RAW_HEADER)] != RAW_HEADER or self.view[RAW_START] != CommandId.DESCRIPTIONS:
+            self.close()
+            raise ValueError(f"{path}: doesn't start like a replay")
+
+        (raw_len,) = struct.unpack_from(">I", self.view, len(RAW_HEADER))
+        self.raw_start = RAW_START
+        self.raw_end = RAW_START + raw_len if raw_len else len(self.view)
+
+        desc_size = self.view[RAW_START + 1]
+        self.sizes = dict(struct.iter_unpack(">BH", self.view[RAW_START + 2 : RAW_START + 1 + desc_size]))
+
+        # packet sizes (command byte included) by command byte, for the cursor
+        # walk; 0 is DESCRIPTIONS or something the replay doesn't describe
+        self._strides = [0] * 256
+        for cmd, size in self.sizes.items():
+            self._strides[cmd] = 1 + size
+        self._max_stride = max(self._strides + [1 + desc_size])
+
+    def close(self):
+        self.view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            logger.debug(f"{self.path}: still has live views, leaving it mapped")
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_raw(self, start: int = None, end: int = None):
+        """(command, payload offset, payload size) for every packet in [start, end)"""
+        view = self.mm  # indexes a bit faster than the memoryview
+        strides = self._strides
+        pos = self.raw_start if start is None else start
+        end = self.raw_end if end is None else end
+
+        # until here, no packet can run off the end
+        safe_end = end - self._max_stride
+        while pos < end:
+            cmd = view[pos]
+            stride = strides[cmd]
+            if not stride:
+                if cmd != CommandId.DESCRIPTIONS:
+                    raise ValueError(f"{self.path}: packet type {cmd:#x} at {pos:#x} isn't in DESCRIPTIONS")
+                stride = 1 + view[pos + 1]
+
+            if pos >= safe_end and pos + stride > end:
+                logger.warning(f"{self.path}: packet {cmd:#x} at {pos:#x} runs off the end")
+                return
+
+            yield cmd, pos + 1, stride - 1
+            pos += stride
+
+    def _handler_table(self, handlers: dict) -> list:
+        """handlers by command byte, as fn(buf, off, size)"""
+        table = [None] * 256
+        for cmd, handler in handlers.items():
+            size = self.sizes.get(cmd)
+            need = getattr(handler, "size", 0)
+            if size is not None and need > size:
+                raise ValueError(f"{self.path}: {handler!r} needs {need:#x} bytes of {cmd!r}, which is only {size:#x} here")
+
+            if isinstance(handler, struct.Struct):
+                handler = lambda buf, off, size, unpack=handler.unpack_from: unpack(buf, off)
+            table[cmd] = handler
+
+        return table
+
+    def decode(self, handlers: dict, start: int = None, end: int = None):
+        """
+        (command, handler's result) for just the commands in `handlers`, a
+        {command: handler} where a handler is a struct.Struct (you get the
+        tuple), a Fields, or any fn(buf, off, size). every other packet is
+        only stepped over. commands that come in SPLIT_MESSAGEs (BONES,
+        GECKO_LIST) are put back together first and handed over at offset 0
+        of their own bytes.
+        """
+        table = self._handler_table(handlers)
+        view = self.mm
+        commands = _COMMANDS
+        split = None if table[CommandId.SPLIT_MESSAGE] else SplitMessage(self.sizes)
+
+        for cmd, off, size in self.iter_raw(start, end):
+            handler = table[cmd]
+            if handler is not None:
+                yield commands.get(cmd, cmd), handler(view, off, size)
+
+            elif split is not None and cmd == CommandId.SPLIT_MESSAGE:
+                # only bother with the chunks of something we're after
+                if table[view[off + SPLIT_BLOCK + 2]] is None:
+                    continue
+                done = split.feed(self.view, off)
+                if done is not None:
+                    wrapped, data = done
+                    yield wrapped, table[wrapped](data, 0, len(data))
+
+    def offsets(self, commands) -> dict[int, np.ndarray]:
+        """payload offsets of every packet of each of `commands`, in one pass"""
+        found = {cmd: [] for cmd in commands}
+        table = [None] * 256
+        for cmd, offs in found.items():
+            table[cmd] = offs.append
+
+        for cmd, off, size in self.iter_raw():
+            append = table[cmd]
+            if append is not None:
+                append(off)
+
+        return {cmd: np.array(offs, dtype=np.int64) for cmd, offs in found.items()}
+
+    def payloads(self, cmd: int, offsets: np.ndarray) -> np.ndarray:
+        """
+        the `cmd` payloads at `offsets`, copied back to back into one
+        (N, size) byte array (ready for a structured dtype)
+        """
+        size = self.sizes[cmd]
+        data = np.frombuffer(self.view, dtype=np.uint8)
+        return data[offsets[:, None] + np.arange(size)]
+
+    def split_messages(self, cmd: int, split_offsets: np.ndarray = None) -> np.ndarray:
+        """
+        every `cmd` message that came in SPLIT_MESSAGEs, put back together
+        into one preallocated (N, size) byte array (size per DESCRIPTIONS).
+        `split_offsets` are the SPLIT_MESSAGE payload offsets, if you have
+        them from offsets() already. a message cut off at the end is dropped.
+        """
+        if split_offsets is None:
+            split_offsets = self.offsets([CommandId.SPLIT_MESSAGE])[CommandId.SPLIT_MESSAGE]
+
+        data = np.frombuffer(self.view, dtype=np.uint8)
+        trailers = data[split_offsets[:, None] + SPLIT_BLOCK + np.arange(SPLIT_TRAILER.size)]
+        mine = trailers[:, 2] == cmd
+        offsets, trailers = split_offsets[mine], trailers[mine]
+        actual = trailers[:, 0].astype(np.int64) << 8 | trailers[:, 1]
+        is_last = trailers[:, 3] != 0
+
+        size = self.sizes[cmd]
+        last = np.flatnonzero(is_last)
+        out = np.zeros((len(last), size), dtype=np.uint8)
+        if not len(last):
+            return out
+
+        n_chunks = last[-1] + 1
+        offsets, actual, is_last = offsets[:n_chunks], actual[:n_chunks], is_last[:n_chunks]
+        per_message = np.diff(np.r_[-1, last])
+        k = int(per_message[0])
+        widths = np.minimum(SPLIT_BLOCK, size - SPLIT_BLOCK * np.arange(k))
+
+        if (per_message == k).all() and (actual.reshape(-1, k) == widths).all():
+            # the usual: every message is the described size, so chunk j of
+            # each one lands at j * 0x200; copy column by column
+            blocks = np.lib.stride_tricks.sliding_window_view(data, SPLIT_BLOCK)
+            offsets = offsets.reshape(-1, k)
+            for j, width in enumerate(widths.tolist()):
+                out[:, j * SPLIT_BLOCK : j * SPLIT_BLOCK + width] = blocks[offsets[:, j], :width]
+            return out
+
+        logger.debug(f"{self.path}: {cmd:#x} messages aren't all {size:#x} bytes, reassembling chunk by chunk")
+        row, pos = 0, 0
+        for off, n, ends in zip(offsets.tolist(), actual.tolist(), is_last.tolist()):
+            take = max(min(n, size - pos), 0)  # past the described size gets cut
+            out[row, pos : pos + take] = data[off : off + take]
+            pos += n
+            if ends:
+                row, pos = row + 1, 0
+
+        return out
+
+    def packets(self, start: int = None, end: int = None):
+        """{'id', 'packet'} per packet"""
+        view = self.view
+        decoders = DECODERS
+        commands = _COMMANDS
+
+        for cmd, off, size in self.iter_raw(start, end):
+            decode = decoders.get(cmd)
+            yield {"id": commands.get(cmd, cmd), "packet": decode(view, off, size) if decode else None}
+
+    def messages(self, start: int = None, end: int = None):
+        """(packet, None) per packet, or for a reassembled SPLIT_MESSAGE, (its decoded contents, the bytes)"""
+        view = self.view
+        decoders = DECODERS
+        commands = _COMMANDS
+        split = SplitMessage(self.sizes)
+
+        for cmd, off, size in self.iter_raw(start, end):
+            if cmd != CommandId.SPLIT_MESSAGE:
+                decode = decoders.get(cmd)
+                yield {"id": commands.get(cmd, cmd), "packet": decode(view, off, size) if decode else None}, None
+                continue
+
+            done = split.feed(view, off)
+            if done is not None:
+                wrapped, data = done
+                decode = decoders.get(wrapped)
+                yield {"id": wrapped, "packet": decode(data, 0, len(data)) if decode else None}, data
@@ -0,0 +1,327 @@
+"""
+whole-replay frame data as arrays.
+
+one walk over the event stream collects where every PRE_FRAME,
+POST_FRAME and ITEM payload is; each kind is then gathered into one
+contiguous byte array and decoded in a go with a big endian structured
+dtype, no per-frame python. pre/post come out (frames, 4) by port, item
+updates as one flat array with per-frame offsets. BONES messages are put
+back together into one (messages, size) array the same way, and their
+transforms come out (frames, 4, bones, ...).
+
+    fd = frame_data(SlpFile("game.slp"))
+    fd.post["percent"][:, 0]        # port 1's percent, every frame
+    fd.items_at(fd.frames[-1])      # what items were out on the last frame
+    bd = bone_data(SlpFile("game.slp"))
+    bd.position[:, 0, 4]            # port 1's bone 4's translation, every frame
+
+offsets are into the payload (the slippi spec's, minus the command byte).
+fields newer than the replay are left off.
+"""
+
+from dataclasses import dataclass
+from logging import getLogger
+
+import click
+import numpy as np
+
+from schema import Schema
+from slp import SlpFile, CommandId
+
+logger = getLogger(__name__)
+
+N_PORTS = 4
+
+PreFrame_s = Schema(
+    "PreFrame",
+    [
+        ("frame", 0x0, "i4"),
+        ("player", 0x4, "u1"),
+        ("follower", 0x5, "u1"),
+        ("seed", 0x6, "u4"),
+        ("action_state", 0xA, "u2"),
+        ("x", 0xC, "f4"),
+        ("y", 0x10, "f4"),
+        ("facing", 0x14, "f4"),
+        ("joystick", 0x18, "f4", (2,)),
+        ("cstick", 0x20, "f4", (2,)),
+        ("trigger", 0x28, "f4"),
+        ("processed_buttons", 0x2C, "u4"),
+        ("physical_buttons", 0x30, "u2"),
+        ("physical_l", 0x32, "f4"),
+        ("physical_r", 0x36, "f4"),
+        ("x_analog_ucf", 0x3A, "i1"),
+        ("percent", 0x3B, "f4"),
+        ("y_analog_ucf", 0x3F, "i1"),
+    ],
+    size=0x40,
+)
+
+PostFrame_s = Schema(
+    "PostFrame",
+    [
+        ("frame", 0x0, "i4"),
+        ("player", 0x4, "u1"),
+        ("follower", 0x5, "u1"),
+        ("character", 0x6, "u1"),
+        ("action_state", 0x7, "u2"),
+        ("x", 0x9, "f4"),
+        ("y", 0xD, "f4"),
+        ("facing", 0x11, "f4"),
+        ("percent", 0x15, "f4"),
+        ("shield", 0x19, "f4"),
+        ("last_attack_landed", 0x1D, "u1"),
+        ("combo_count", 0x1E, "u1"),
+        ("last_hit_by", 0x1F, "u1"),
+        ("stocks", 0x20, "u1"),
+        ("action_state_frame", 0x21, "f4"),
+        ("state_flags", 0x25, "u1", (5,)),
+        ("misc_as", 0x2A, "f4"),
+        ("airborne", 0x2E, "u1"),
+        ("last_ground_id", 0x2F, "u2"),
+        ("jumps_remaining", 0x31, "u1"),
+        ("l_cancel", 0x32, "u1"),
+        ("hurtbox_state", 0x33, "u1"),
+        ("self_air_speed", 0x34, "f4", (2,)),
+        ("attack_speed", 0x3C, "f4", (2,)),
+        ("self_ground_speed_x", 0x44, "f4"),
+        ("hitlag", 0x48, "f4"),
+        ("animation", 0x4C, "u4"),
+        ("instance_hit_by", 0x50, "u2"),
+        ("instance_id", 0x52, "u2"),
+    ],
+    size=0x54,
+)
+
+ItemUpdate_s = Schema(
+    "ItemUpdate",
+    [
+        ("frame", 0x0, "i4"),
+        ("type", 0x4, "u2"),
+        ("state", 0x6, "u1"),
+        ("facing", 0x7, "f4"),
+        ("velocity", 0xB, "f4", (2,)),
+        ("position", 0x13, "f4", (2,)),
+        ("damage_taken", 0x1B, "u2"),
+        ("expiration_timer", 0x1D, "f4"),
+        ("spawn_id", 0x21, "u4"),
+        ("misc", 0x25, "u1", (4,)),
+        ("owner", 0x29, "i1"),
+        ("instance_id", 0x2A, "u2"),
+    ],
+    size=0x2C,
+)
+
+# a BONES message: header, then a transform per bone. the rotations are
+# xyzw quaternions (the [Bone Transforms] log in junk.txt prints the
+# jobj's euler rotate instead, same joints)
+BonesHeader_s = Schema(
+    "BonesHeader",
+    [
+        ("frame", 0x0, "i4"),
+        ("player", 0x4, "u1"),
+        ("character", 0x5, "u1"),
+        ("n_bones", 0x6, "u1"),
+        ("unk", 0x8, "u1", (0x20,)),
+    ],
+    size=0x28,
+)
+
+BoneTransform_s = Schema(
+    "BoneTransform",
+    [
+        ("position", 0x0, "f4", (3,)),
+        ("rotation", 0xC, "f4", (4,)),
+        ("scale", 0x1C, "f4", (3,)),
+    ],
+    size=0x28,
+)
+
+
+def _last_of_each(keys: np.ndarray) -> np.ndarray:
+    """indices of the last occurrence of every distinct key (a rollback redoes frames; the redo wins)"""
+    _, first_from_end = np.unique(keys[::-1], return_index=True)
+    return np.sort(len(keys) - 1 - first_from_end)
+
+
+@dataclass
+class FrameData:
+    frames: np.ndarray  # (F,) frame numbers, first..last with no gaps
+    pre: np.ndarray  # (F, 4) PreFrame records by port, zeroed where absent
+    post: np.ndarray  # (F, 4) PostFrame records
+    present: np.ndarray  # (F, 4) bool
+    # ice climbers' nana, same layout
+    follower_pre: np.ndarray
+    follower_post: np.ndarray
+    follower_present: np.ndarray
+    items: np.ndarray  # (I,) ItemUpdate records, grouped by frame
+    item_offsets: np.ndarray  # (F + 1,) frames[i]'s items are items[item_offsets[i]:item_offsets[i + 1]]
+
+    def index(self, frame: int) -> int:
+        return frame - int(self.frames[0])
+
+    def items_at(self, frame: int) -> np.ndarray:
+        i = self.index(frame)
+        return self.items[self.item_offsets[i] : self.item_offsets[i + 1]]
+
+    @property
+    def item_counts(self) -> np.ndarray:
+        return np.diff(self.item_offsets)
+
+
+def _by_port(recs: np.ndarray, first: int, n_frames: int):
+    """scatter player records into (frames, port) for leaders and followers"""
+    fi = recs["frame"].astype(np.int64) - first
+    port = recs["player"].astype(np.int64)
+    follower = recs["follower"] != 0
+
+    keep = _last_of_each((fi * N_PORTS + port) * 2 + follower)
+    fi, port, follower, recs = fi[keep], port[keep], follower[keep], recs[keep]
+
+    out = []
+    for which in (~follower, follower):
+        table = np.zeros((n_frames, N_PORTS), dtype=recs.dtype)
+        present = np.zeros((n_frames, N_PORTS), dtype=bool)
+        table[fi[which], port[which]] = recs[which]
+        present[fi[which], port[which]] = True
+        out += [table, present]
+
+    return out
+
+
+def frame_data(slp: SlpFile) -> FrameData:
+    commands = (CommandId.PRE_FRAME, CommandId.POST_FRAME, CommandId.ITEM)
+    offsets = slp.offsets(c for c in commands if c in slp.sizes)
+
+    def records(cmd, schema):
+        if cmd not in offsets:
+            return np.zeros(0, dtype=schema.dtype)
+        schema = schema.resized(slp.sizes[cmd])
+        return slp.payloads(cmd, offsets[cmd]).view(schema.dtype)[:, 0]
+
+    pre = records(CommandId.PRE_FRAME, PreFrame_s)
+    post = records(CommandId.POST_FRAME, PostFrame_s)
+    items = records(CommandId.ITEM, ItemUpdate_s)
+
+    if not len(pre):
+        raise ValueError(f"{slp.path}: no frames")
+
+    first, last = int(pre["frame"].min()), int(pre["frame"].max())
+    n_frames = last - first + 1
+
+    pre, present, follower_pre, follower_present = _by_port(pre, first, n_frames)
+    post, _, follower_post, _ = _by_port(post, first, n_frames)
+
+    item_fi = items["frame"].astype(np.int64) - first
+    if len(items) and "spawn_id" in items.dtype.names:
+        keep = _last_of_each(item_fi * 2**32 + items["spawn_id"])
+        items, item_fi = items[keep], item_fi[keep]
+    order = np.argsort(item_fi, kind="stable")
+    items, item_fi = items[order], item_fi[order]
+    item_offsets = np.searchsorted(item_fi, np.arange(n_frames + 1))
+
+    return FrameData(
+        frames=np.arange(first, last + 1, dtype=np.int32),
+        pre=pre,
+        post=post,
+        present=present,
+        follower_pre=follower_pre,
+        follower_post=follower_post,
+        follower_present=follower_present,
+        items=items,
+        item_offsets=item_offsets,
+    )
+
+
+@dataclass
+class BoneData:
+    frames: np.ndarray  # (F,) frame numbers, first..last with no gaps
+    present: np.ndarray  # (F, 4) bool, by port
+    character: np.ndarray  # (F, 4) internal character id (FighterKind), same as slp._bones
+    n_bones: np.ndarray  # (F, 4)
+    position: np.ndarray  # (F, 4, B, 3) f4, zeroed past n_bones & where absent
+    rotation: np.ndarray  # (F, 4, B, 4) xyzw quaternions
+    scale: np.ndarray  # (F, 4, B, 3)
+
+
+def bone_data(slp: SlpFile) -> BoneData:
+    """every BONES message in the replay, decoded in one go"""
+    if CommandId.BONES not in slp.sizes:
+        raise ValueError(f"{slp.path}: no bones in this replay")
+
+    msgs = slp.split_messages(CommandId.BONES)
+    if not len(msgs):
+        raise ValueError(f"{slp.path}: no bones in this replay")
+
+    n, size = msgs.shape
+    max_bones = (size - BonesHeader_s.size) // BoneTransform_s.size
+    headers = np.ndarray(n, dtype=BonesHeader_s.dtype, buffer=msgs, strides=(size,))
+    transforms = np.ndarray(
+        (n, max_bones),
+        dtype=BoneTransform_s.dtype,
+        buffer=msgs,
+        offset=BonesHeader_s.size,
+        strides=(size, BoneTransform_s.size),
+    )
+
+    fi = headers["frame"].astype(np.int64)
+    first = int(fi.min())
+    n_frames = int(fi.max()) - first + 1
+    fi -= first
+    port = headers["player"].astype(np.int64)
+
+    keep = _last_of_each(fi * N_PORTS + port)
+    fi, port, headers, transforms = fi[keep], port[keep], headers[keep], transforms[keep]
+
+    # slots past a message's own bone count are padding
+    padding = np.arange(max_bones) >= headers["n_bones"][:, None]
+    if padding.any():
+        transforms[padding] = np.zeros(1, dtype=transforms.dtype)
+
+    def scatter(field, shape):
+        out = np.zeros((n_frames, N_PORTS, max_bones) + shape, dtype=np.float32)
+        out[fi, port] = transforms[field]
+        return out
+
+    present = np.zeros((n_frames, N_PORTS), dtype=bool)
+    present[fi, port] = True
+    character = np.zeros((n_frames, N_PORTS), dtype=np.uint8)
+    character[fi, port] = headers["character"]
+    n_bones = np.zeros((n_frames, N_PORTS), dtype=np.uint8)
+    n_bones[fi, port] = headers["n_bones"]
+
+    return BoneData(
+        frames=np.arange(first, first + n_frames, dtype=np.int32),
+        present=present,
+        character=character,
+        n_bones=n_bones,
+        position=scatter("position", (3,)),
+        rotation=scatter("rotation", (4,)),
+        scale=scatter("scale", (3,)),
+    )
+
+
+@click.command()
+@click.argument("slppath", type=click.Path(exists=True, dir_okay=False))
+def cli(slppath):
+    """per-port summary of a replay"""
+    with SlpFile(slppath) as slp:
+        fd = frame_data(slp)
+
+    print(f"frames {fd.frames[0]}..{fd.frames[-1]} ({len(fd.frames)}), {len(fd.items)} item updates")
+    for port in range(N_PORTS):
+        here = np.flatnonzero(fd.present[:, port])
+        if not len(here):
+            continue
+
+        post = fd.post[here, port]
+        end = post[-1]
+        print(
+            f"port {port + 1}: {len(here)} frames, {len(np.unique(post['action_state']))} action states, "
+            f"ends on {end['stocks']} stocks at {end['percent']:.0f}%, "
+            f"x {post['x'].min():.1f}..{post['x'].max():.1f} y {post['y'].min():.1f}..{post['y'].max():.1f}"
+        )
+
+
+if __name__ == "__main__":
+    cli()
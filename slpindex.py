@@ -0,0 +1,164 @@
+"""
+a per-frame index of a replay, so a frame (or a range of them) can be
+read straight out of the middle of a replay instead of after parsing
+everything before it.
+
+frames are keyed on the FRAME_BOOKEND frame. a frame is everything from
+just after the previous bookend through its own; for each we keep where
+it starts and ends and where the first packet of each command type in
+it is (-1 for none). the index lives next to the replay as `<replay>.idx`
+(an .npz of sorted arrays), stamped with the replay's size and mtime and
+rebuilt when they don't match.
+
+    index = load_index("game.slp")
+    start, end = index.span(-94)
+    for packet, buf in slp.messages(start, end): ...
+"""
+
+import os
+from dataclasses import dataclass
+from logging import getLogger
+
+import click
+import numpy as np
+
+from slp import SlpFile, CommandId
+
+logger = getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+
+
+@dataclass
+class FrameIndex:
+    frames: np.ndarray  # (F,) i4 bookend frame numbers, sorted
+    start: np.ndarray  # (F,) i8 file offset of each frame's first packet
+    end: np.ndarray  # (F,) i8 just past its bookend
+    first: dict[int, np.ndarray]  # command byte -> (F,) i8 offset of its first packet in each frame, or -1
+
+    def find(self, frame: int) -> int:
+        """row of `frame`"""
+        i = int(np.searchsorted(self.frames, frame))
+        if i == len(self.frames) or self.frames[i] != frame:
+            raise KeyError(f"frame {frame} isn't in the replay ({self.frames[0]}..{self.frames[-1]})")
+        return i
+
+    def span(self, first: int, last: int = None) -> tuple[int, int]:
+        """[start, end) file offsets covering frames first..last"""
+        return int(self.start[self.find(first)]), int(self.end[self.find(first if last is None else last)])
+
+    def packet(self, frame: int, cmd: int) -> int:
+        """offset of the first `cmd` packet in `frame`, or -1"""
+        offsets = self.first.get(cmd)
+        return -1 if offsets is None else int(offsets[self.find(frame)])
+
+
+def build_index(slp: SlpFile) -> FrameIndex:
+    # one walk for every packet's command & offset; the rest is numpy
+    cmds, offs = [], []
+    for cmd, off, size in slp.iter_raw():
+        cmds.append(cmd)
+        offs.append(off - 1)
+    cmds = np.array(cmds, dtype=np.uint8)
+    offs = np.array(offs, dtype=np.int64)
+
+    bookends = np.flatnonzero(cmds == CommandId.FRAME_BOOKEND)
+    if not len(bookends):
+        raise ValueError(f"{slp.path}: no complete frames")
+    frames = slp.payloads(CommandId.FRAME_BOOKEND, offs[bookends] + 1)[:, :4].copy().view(">i4")[:, 0]
+
+    # the first frame starts at its frame start (or pre-frame, before there were those)
+    starters = np.flatnonzero((cmds == CommandId.INITIAL_RNG) | (cmds == CommandId.PRE_FRAME))
+    first_packet = np.r_[starters[0], bookends[:-1] + 1]
+
+    start = offs[first_packet]
+    end = offs[bookends] + 1 + slp.sizes[CommandId.FRAME_BOOKEND]
+
+    # which frame (bookend) every packet goes with; -1 for before the first / after the last
+    frame_of = np.searchsorted(bookends, np.arange(len(cmds)))
+    frame_of[: first_packet[0]] = -1
+    frame_of[bookends[-1] + 1 :] = -1
+
+    first = {}
+    for cmd in np.unique(cmds[frame_of >= 0]).tolist():
+        idx = np.flatnonzero((cmds == cmd) & (frame_of >= 0))
+        fr, at = np.unique(frame_of[idx], return_index=True)
+        first[cmd] = np.full(len(bookends), -1, dtype=np.int64)
+        first[cmd][fr] = offs[idx[at]]
+
+    # rollback replays a frame; the last go at it is the one that stuck.
+    # np.unique sorts, which is the order we want anyway
+    _, last = np.unique(frames[::-1], return_index=True)
+    keep = len(frames) - 1 - last
+
+    return FrameIndex(
+        frames=frames[keep].astype(np.int32),
+        start=start[keep],
+        end=end[keep],
+        first={cmd: offsets[keep] for cmd, offsets in first.items()},
+    )
+
+
+def _stamp(path) -> np.ndarray:
+    st = os.stat(path)
+    return np.array([INDEX_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def save_index(index: FrameIndex, path, replay_path):
+    arrays = {f"first_{cmd:02x}": offsets for cmd, offsets in index.first.items()}
+    with open(path, "wb") as f:
+        np.savez(f, stamp=_stamp(replay_path), frames=index.frames, start=index.start, end=index.end, **arrays)
+
+
+def read_index(path, replay_path) -> FrameIndex | None:
+    """the index at `path`, or None if it's missing or for some other version of the replay"""
+    try:
+        with np.load(path) as npz:
+            if not np.array_equal(npz["stamp"], _stamp(replay_path)):
+                logger.info(f"{path}: stale")
+                return None
+
+            return FrameIndex(
+                frames=npz["frames"],
+                start=npz["start"],
+                end=npz["end"],
+                first={int(name[6:], 16): npz[name] for name in npz.files if name.startswith("first_")},
+            )
+    except (OSError, KeyError, ValueError) as e:
+        logger.info(f"{path}: can't use it ({e})")
+        return None
+
+
+def load_index(replay_path, rebuild: bool = False) -> FrameIndex:
+    """the replay's index from its sidecar, building (and saving) it if need be"""
+    path = str(replay_path) + INDEX_SUFFIX
+    index = None if rebuild else read_index(path, replay_path)
+    if index is not None:
+        return index
+
+    with SlpFile(replay_path) as slp:
+        index = build_index(slp)
+
+    try:
+        save_index(index, path, replay_path)
+    except OSError as e:
+        logger.warning(f"{path}: couldn't save the index ({e})")
+
+    return index
+
+
+@click.command()
+@click.argument("slppath", type=click.Path(exists=True, dir_okay=False))
+@click.option("--rebuild", is_flag=True, help="rebuild even if the sidecar looks current")
+def cli(slppath, rebuild):
+    """build (or check) SLPPATH's frame index"""
+    index = load_index(slppath, rebuild)
+    print(f"{len(index.frames)} frames, {index.frames[0]}..{index.frames[-1]}")
+    for cmd, offsets in sorted(index.first.items()):
+        name = CommandId(cmd).name if cmd in CommandId._value2member_map_ else f"{cmd:#x}"
+        print(f"  {name}: in {(offsets >= 0).sum()} frames")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,109 @@
+"""
+offline RAM snapshots: raw dumps of GC main memory (first byte = 0x80000000),
+either the 24 MiB that's actually there or the full 32 MiB arena.
+
+SnapshotMemory mmaps a dump and hands out memoryview slices of it, so it's
+a drop-in DOLMemory for melee.Melee & friends with no syscalls and no copies.
+"""
+
+import os
+import mmap
+from logging import getLogger
+
+import click
+
+from memory import MemoryBackend, DOLMemory, GC_RAM_START, GC_RAM_END, GC_RAM_SIZE
+from petrautil.hexdump import hexdump
+
+logger = getLogger(__name__)
+
+# what the console actually has; the rest of GC_RAM_SIZE is dolphin slack
+GC_RAM_USED = GC_RAM_END - GC_RAM_START
+VALID_SIZES = {GC_RAM_USED, GC_RAM_SIZE}
+
+
+class SnapshotBackend(MemoryBackend):
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+
+        size = os.fstat(self.f.fileno()).st_size
+        if size not in VALID_SIZES:
+            self.f.close()
+            raise ValueError(f"{path}: {size:#x} bytes doesn't look like a RAM dump")
+
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        self.size = size
+
+    def read(self, offset, size):
+        if offset + size > self.size:
+            raise ValueError(f"read past end of snapshot: {GC_RAM_START + offset:x}+{size:x}")
+
+        return self.view[offset : offset + size]
+
+    def close(self):
+        # views handed out by read() keep the map alive; only drop ours
+        self.view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            logger.debug(f"{self.path}: still has live views, leaving it mapped")
+        self.f.close()
+
+
+class SnapshotMemory(DOLMemory):
+    def __init__(self, path):
+        super().__init__(SnapshotBackend(path))
+
+
+def capture(mem: DOLMemory, path, size: int = GC_RAM_USED, chunk: int = 0x100000):
+    """write `size` bytes of RAM from `mem` (usually live) into a dump at `path`"""
+    ranges = [(off, min(chunk, size - off)) for off in range(0, size, chunk)]
+
+    with open(path, "wb") as f:
+        for buf in mem.backend.read_many(ranges):
+            f.write(buf)
+
+
+def read_ram(mem: DOLMemory, size: int = GC_RAM_USED, chunk: int = 0x100000) -> bytearray:
+    """`size` bytes of RAM from `mem` in one buffer, for whole-RAM analysis"""
+    ranges = [(off, min(chunk, size - off)) for off in range(0, size, chunk)]
+
+    out = bytearray(size)
+    for (off, n), buf in zip(ranges, mem.backend.read_many(ranges)):
+        out[off : off + n] = buf
+
+    return out
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command("capture")
+@click.argument("out", type=click.Path(dir_okay=False, writable=True))
+@click.option("--full", is_flag=True, help="dump the whole 32MiB arena instead of 24MiB")
+def capture_cmd(out, full):
+    mem = DOLMemory()
+    capture(mem, out, size=GC_RAM_SIZE if full else GC_RAM_USED)
+    mem.close()
+
+
+@cli.command("hexdump")
+@click.argument("dump", type=click.Path(exists=True, dir_okay=False))
+@click.option("--start", type=lambda s: int(s, 0), default=f"{GC_RAM_START:#x}", help="address to start at")
+@click.option("--length", type=lambda s: int(s, 0), help="bytes to dump (default: to the end)")
+@click.option("--out", type=click.File("wb"), default="-", help="where to (default: stdout)")
+def hexdump_cmd(dump, start, length, out):
+    """hexdump (part of) a RAM dump, fast"""
+    backend = SnapshotBackend(dump)
+    offset = start - GC_RAM_START
+    stop = backend.size if length is None else min(offset + length, backend.size)
+
+    hexdump(backend.mm, GC_RAM_START).write(out, offset, stop)
+
+
+if __name__ == "__main__":
+    cli()
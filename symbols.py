@@ -0,0 +1,159 @@
+"""
+address -> symbol lookups.
+
+loads either a linker/dolphin .map or a decomp (dtk) symbols.txt into
+sorted parallel numpy arrays, so single lookups are a bisection and a
+whole array of addresses annotates in one searchsorted. without a file,
+you get the handful of addresses melee.py knows about.
+
+    syms = load_symbols("GALE01.map")
+    syms.format(0x804D6544)       # "ftPartsTable" or whatever the map calls it
+    syms.annotate(crawl.addr)     # ["Player_80453080+0xb0", ...]
+"""
+
+import re
+from logging import getLogger
+
+import click
+import numpy as np
+
+from memory import GC_RAM_START, GC_RAM_END
+from melee import P_PLAYER_SLOTS, PLAYER_SLOT_SIZE, N_PLAYER_SLOTS, P_FTPARTSTABLE, P_FRAME_COUNTER
+
+logger = getLogger(__name__)
+
+# dtk symbols.txt:  fn_80003100 = .init:0x80003100; // type:function size:0x9C scope:global
+DTK_LINE = re.compile(r"^\s*(?P<name>\S+)\s*=\s*(?:\S+:)?0x(?P<addr>[0-9A-Fa-f]+);(?:.*\bsize:0x(?P<size>[0-9A-Fa-f]+))?")
+# .map (dolphin's or codewarrior's):  00000000 00009c 80003100  4 __start 	init.o
+MAP_LINE = re.compile(r"^\s*[0-9A-Fa-f]{8}\s+(?P<size>[0-9A-Fa-f]+)\s+(?P<addr>[0-9A-Fa-f]{8})\s+\d+\s+(?P<name>[^\s.]\S*)")
+# or just "80453080 name"
+PLAIN_LINE = re.compile(r"^\s*(?:0x)?(?P<addr>[0-9A-Fa-f]{8})\s+(?P<name>\S+)\s*$")
+
+BUILTIN_SYMBOLS = [
+    (P_PLAYER_SLOTS, PLAYER_SLOT_SIZE * N_PLAYER_SLOTS, "player_slots"),
+    (P_FTPARTSTABLE, 4, "ftPartsTable"),
+    (P_FRAME_COUNTER, 4, "frame_counter"),
+]
+
+
+class SymbolMap:
+    """
+    symbols sorted by address. a symbol with no known size runs up to the
+    next one; where two share an address, the first one given wins.
+    """
+
+    def __init__(self, symbols: list[tuple[int, int, str]]):
+        symbols = sorted(symbols, key=lambda s: s[0])  # stable, so the first of a duplicate stays first
+
+        addrs, sizes, names = [], [], []
+        for addr, size, name in symbols:
+            if addrs and addrs[-1] == addr:
+                continue
+            addrs.append(addr)
+            sizes.append(size)
+            names.append(name)
+
+        self.addrs = np.array(addrs, dtype=np.int64)
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.names = names
+
+        following = np.r_[self.addrs[1:], GC_RAM_END]
+        self.ends = np.where(self.sizes > 0, self.addrs + self.sizes, following)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"<SymbolMap {len(self)} symbols>"
+
+    def _find(self, addrs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """index of the symbol each address is inside of, and whether it really is inside"""
+        i = np.searchsorted(self.addrs, addrs, side="right") - 1
+        inside = (i >= 0) & (addrs < self.ends[np.maximum(i, 0)])
+        return i, inside
+
+    def lookup(self, addr: int) -> tuple[str, int] | None:
+        """(name, offset into it), or None"""
+        i, inside = self._find(np.int64(addr))
+        if not inside:
+            return None
+        return self.names[i], addr - int(self.addrs[i])
+
+    def format(self, addr: int) -> str:
+        """"name+0x10", "name", or just the address if it's in nothing we know"""
+        hit = self.lookup(addr)
+        if hit is None:
+            return f"{addr:08x}"
+
+        name, offset = hit
+        return f"{name}+{offset:#x}" if offset else name
+
+    def annotate(self, addrs) -> list[str]:
+        """format() a whole array of addresses at once, with "" for unknowns"""
+        addrs = np.asarray(addrs, dtype=np.int64)
+        i, inside = self._find(addrs)
+        offsets = addrs - self.addrs[np.maximum(i, 0)]
+
+        names = self.names
+        return [
+            ("" if not ok else f"{names[j]}+{off:#x}" if off else names[j])
+            for j, ok, off in zip(i.tolist(), inside.tolist(), offsets.tolist())
+        ]
+
+    def starting_in(self, addr: int, size: int) -> list[tuple[int, str]]:
+        """(addr, name) of every symbol that starts in [addr, addr+size)"""
+        lo = np.searchsorted(self.addrs, addr, side="left")
+        hi = np.searchsorted(self.addrs, addr + size, side="left")
+        return list(zip(self.addrs[lo:hi].tolist(), self.names[lo:hi]))
+
+    def entries(self) -> list[tuple[int, int, str]]:
+        return list(zip(self.addrs.tolist(), self.sizes.tolist(), self.names))
+
+    def merged(self, symbols: list[tuple[int, int, str]]) -> "SymbolMap":
+        """a copy with more symbols added; ours win on clashes"""
+        return SymbolMap(self.entries() + list(symbols))
+
+
+def parse_symbols(lines) -> list[tuple[int, int, str]]:
+    """(addr, size, name) out of a .map, a dtk symbols.txt, or "addr name" lines"""
+    symbols = []
+    for line in lines:
+        if m := DTK_LINE.match(line):
+            addr, size = int(m["addr"], 16), int(m["size"] or "0", 16)
+        elif m := MAP_LINE.match(line):
+            addr, size = int(m["addr"], 16), int(m["size"], 16)
+        elif m := PLAIN_LINE.match(line):
+            addr, size = int(m["addr"], 16), 0
+        else:
+            continue
+
+        if GC_RAM_START <= addr < GC_RAM_END:
+            symbols.append((addr, size, m["name"]))
+
+    return symbols
+
+
+def load_symbols(path=None) -> SymbolMap:
+    """symbols from `path` (plus the builtins), or just the builtins"""
+    if path is None:
+        return SymbolMap(BUILTIN_SYMBOLS)
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        symbols = parse_symbols(f)
+
+    logger.info(f"{path}: {len(symbols)} symbols")
+    return SymbolMap(symbols + BUILTIN_SYMBOLS)
+
+
+@click.command()
+@click.option("--symbols", type=click.Path(exists=True, dir_okay=False), help=".map or symbols.txt")
+@click.argument("addrs", nargs=-1, required=True)
+def cli(symbols, addrs):
+    """look up where ADDRS are"""
+    syms = load_symbols(symbols)
+    for addr in addrs:
+        print(f"{int(addr, 16):08x}  {syms.format(int(addr, 16))}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -6,10 +6,12 @@ import IPython
 import click
 import numpy as np
 
-from memory import DOLMemory
+from memory import DOLMemory, seqlock_read
+from snapshot import SnapshotMemory
 from petrautil.hexdump import hexdump
-from melee import FighterKind, FighterBone, JObj_Flags, JObj
-from melee import P_PLAYER_SLOTS, PLAYER_SLOT_SIZE
+from kinematics import forward_kinematics, fk_error
+from melee import FighterKind, JObj_Flags, Melee
+from melee import P_FRAME_COUNTER
 
 
 def get_logged_poses(f) -> dict[str, Any]:
@@ -43,41 +45,31 @@ def get_logged_poses(f) -> dict[str, Any]:
 
 @click.command()
 @click.argument("logtext", type=click.Path())
-def cli(logtext):
+@click.option("--snapshot", type=click.Path(exists=True), help="read from a RAM dump instead of dolphin")
+@click.option("--profile", is_flag=True, help="report where the RAM reads went")
+def cli(logtext, snapshot, profile):
     np.set_printoptions(linewidth=120)
 
     with open(logtext) as f:
         logged_poses = get_logged_poses(f)
 
     ## now do our side
-    mem = DOLMemory()
+    mem = SnapshotMemory(snapshot) if snapshot else DOLMemory()
+    if profile:
+        mem.enable_profiling()
 
-    slot = 0
-    p_StaticPlayer = P_PLAYER_SLOTS + PLAYER_SLOT_SIZE * slot
+    melee = Melee(mem)
 
-    p_p_Fighter_GObj = p_StaticPlayer + 0xB0
-    p_Fighter_GObj = mem.readv(p_p_Fighter_GObj, "I")
-    p_Fighter = mem.readv(p_Fighter_GObj + 0x2C, "I")
-
-    # get bone table size
-    fighter_kind = mem.readv(p_Fighter + 0x4, "I")
-    ftPartsTable = mem.readv(0x804D6544, "I")
-    fighter_ftParts = mem.readv(ftPartsTable + fighter_kind * 4, "I")
-    parts_num = mem.readv(fighter_ftParts + 0x8, "I")
-
-    # pointer to bone table
-    p_bone_table = mem.readv(p_Fighter + 0x5E8, "I")
-
-    bones = [
-        FighterBone.from_bytes(mem.read(p_bone_table + idx * 0x10, 0x10))
-        for idx in range(parts_num)
-    ]
-
-    read_poses = [JObj.from_mem(mem, bone.p_joint) for bone in bones]
+    # dolphin keeps running while we read; make sure the whole pose is from one frame
+    skeleton, torn = seqlock_read(
+        mem, P_FRAME_COUNTER, lambda: melee.get_fighter(slot=0).read_skeleton(), max_retries=5
+    )
+    if torn:
+        print("⚠️  frame counter kept moving during every read; poses may mix two frames")
 
     print("joint        .")
     for idx, log_pose in logged_poses.items():
-        read_pose = read_poses[idx]
+        read_pose = skeleton.jobj(idx)
 
         def fmta(a):
             return " ".join(f"{x:9.2E}" for x in a)
@@ -112,6 +104,19 @@ def cli(logtext):
             )
         )
 
+    ## and our FK against the game's own world matrices (JObj.mtx)
+    fk_err = fk_error(skeleton, forward_kinematics(skeleton))
+
+    FK_ATOL = 1e-3
+    print()
+    print("joint   fk Δmtx")
+    for idx, err in enumerate(fk_err):
+        print("{:02}      {:9.2E} {}".format(idx, err, "✅" if err < FK_ATOL else "❌"))
+
+    if profile:
+        print()
+        print(mem.profiler.report())
+
 
 if __name__ == "__main__":
     cli()
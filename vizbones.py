@@ -1,22 +1,23 @@
-import struct
 import logging
 from dataclasses import dataclass
 
 import IPython
+import click
 import numpy as np
 import pygame
 from OpenGL import GL
 
 from memory import DOLMemory
-from melee import FighterKind, FighterBone, JObj_Flags, JObj, Melee
-from melee import P_PLAYER_SLOTS, PLAYER_SLOT_SIZE
+from melee import FighterKind, FighterBone, JObj_Flags, Melee
 from petrautil.pygameogl import App, run_app
 from petrautil.camera import OrbitCamera
 from petrautil.hexdump import hexdump
 from debugdraw import DebugDrawCtx, GLDebugDrawBackend
+from kinematics import forward_kinematics, topo_levels, fk_error, IncrementalFK
 
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 np.set_printoptions(linewidth=120)
 
 
@@ -24,31 +25,15 @@ mem = DOLMemory()
 melee = Melee(mem)
 
 fighter = melee.get_fighter(slot=0)
-fighter_bones = fighter.get_fighterbones()
+skeleton = fighter.read_skeleton()
+assert JObj_Flags.SKELETON_ROOT in JObj_Flags(int(skeleton.flags[0]))
 
-class RenderableJObj(JObj):
-    @classmethod
-    def from_mem(cls, mem, p_jobj, parent=None):
-        self = super().from_mem(mem, p_jobj)
+levels = topo_levels(skeleton.parent_index)
+fk_err = fk_error(skeleton, forward_kinematics(skeleton, levels=levels))
+logger.info(f"fk vs game matrices: max abs error {fk_err.max():.2e} (joint {fk_err.argmax()})")
 
-        self.parent = parent
-        self.child = self.sister = None
-        if self.p_child:
-            self.child = cls.from_mem(mem, self.p_child, parent=self)
-        if self.p_next:
-            self.child = cls.from_mem(mem, self.p_next, parent=self)
-
-        return self
-
-    def recompute_transforms(self):
-        txf_local = mat_scale(self.scale) @ mat_quat(self.rotate) @ mat_translate(self.translate)
-
-        assert NotImplementedError()
-        # if self.parent:
-        #     # txf_world =
-
-root_jobj = RenderableJObj.from_mem(mem, fighter_bones[0].p_joint)
-assert JObj_Flags.SKELETON_ROOT in root_jobj.flags
+# melee units -> roughly fits the default camera
+BONE_SCALE = 1 / 20
 
 class BonesApp(App):
     def setup(self, winsize):
@@ -57,6 +42,7 @@ class BonesApp(App):
 
         self.camera = OrbitCamera(*winsize)
         self.debugdraw = DebugDrawCtx(GLDebugDrawBackend())
+        self.fk = IncrementalFK()
 
     def draw(self):
         GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
@@ -66,6 +52,15 @@ class BonesApp(App):
         self.debugdraw.cross(np.array([0,0,-1]),0.5)
         self.debugdraw.axes(np.identity(4), axis_length=1, head_size=0.3)
 
+        fighter.read_skeleton(skeleton)
+        world = self.fk.update(skeleton)
+        logger.debug(f"fk: recomputed {self.fk.recomputed}/{len(skeleton)} joints")
+        # centered on the root, wherever it is on stage
+        pos = (world[:, :, 3] - world[0, :, 3]) * BONE_SCALE
+        for idx, parent in enumerate(skeleton.parent_index):
+            if parent >= 0:
+                self.debugdraw.line(pos[parent], pos[idx], np.array([1.0, 1.0, 1.0]))
+
 
         self.debugdraw.backend.mvp_matrix = self.camera.vp_matrix
         self.debugdraw.flush()
@@ -83,5 +78,17 @@ class BonesApp(App):
         if event.type == pygame.MOUSEWHEEL:
             self.camera.zoom += event.y / 50
 
-if __name__ == '__main__':
+@click.command()
+@click.option("--profile", is_flag=True, help="log where the RAM reads go (every few seconds, and at exit)")
+def cli(profile):
+    if profile:
+        mem.enable_profiling(log_interval=5.0)
+
     run_app(BonesApp(), windowsize=(800, int(800*9/16)))
+
+    if profile:
+        print(mem.profiler.report())
+
+
+if __name__ == '__main__':
+    cli()